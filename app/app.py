@@ -4,15 +4,25 @@ Provides REST API for forecasting financial instruments.
 """
 
 from flask import Flask, render_template, request, jsonify
+from flask import stream_with_context
 from flask import send_from_directory
+from flask.json.provider import DefaultJSONProvider
 import sys
 import os
+import hashlib
+import logging
 import math
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from dotenv import load_dotenv
 
 # Load environment variables
 load_dotenv('config.env')
 
+LOGGER = logging.getLogger(__name__)
+
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
@@ -32,31 +42,188 @@ try:
 except Exception as e:
     # Fallback to SQLite on any error
     db = SqliteDatabase()
-from models import get_traditional_factories, get_neural_factories, KERAS_AVAILABLE
-import pandas as pd
+from models import get_traditional_factories, evaluate_model
 import numpy as np
-from datetime import datetime, timedelta
-import json
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
 
 from services.adaptive_service import AdaptiveLearningService
+from services.cache_service import LRUCache
 from services.evaluation_service import EvaluationService
 from services.ingestion_service import IngestionService
 from services.portfolio_service import PortfolioService
 
+
+class NumpyJSONProvider(DefaultJSONProvider):
+    """Stdlib JSON provider that also accepts NumPy scalars and arrays."""
+
+    @staticmethod
+    def default(o):
+        if isinstance(o, np.generic):
+            return o.item()
+        if isinstance(o, np.ndarray):
+            return o.tolist()
+        return DefaultJSONProvider.default(o)
+
+
+class ORJSONProvider(NumpyJSONProvider):
+    """JSON provider that encodes responses and parses request bodies with orjson."""
+
+    def _option(self, sort_keys: bool, indent: bool) -> int:
+        # Datetimes go through Flask's default() so they keep the HTTP date format
+        option = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+                  | orjson.OPT_PASSTHROUGH_DATETIME)
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return option
+
+    def dumps(self, obj, **kwargs) -> str:
+        option = self._option(kwargs.get('sort_keys', self.sort_keys),
+                              bool(kwargs.get('indent')))
+        return orjson.dumps(obj, default=self.default, option=option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = orjson.dumps(obj, default=self.default,
+                            option=self._option(self.sort_keys, indent))
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+
 app = Flask(__name__, 
             template_folder='../templates',
             static_folder='../static')
+# Both providers serialize NumPy values, so handlers can return arrays as-is
+app.json = ORJSONProvider(app) if ORJSON_AVAILABLE else NumpyJSONProvider(app)
 
 # db is initialized above via env-based selector
 
 TRADITIONAL_MODELS = get_traditional_factories()
-NEURAL_MODELS = get_neural_factories()
+# Neural factories and the evaluation specs are built on first use
+# (see _neural_models / _eval_model_specs) so Keras stays out of cold start
+_NEURAL_MODELS = None
+_EVAL_MODEL_SPECS = None
 
 adaptive_service = AdaptiveLearningService(db)
 evaluation_service = EvaluationService(db)
 ingestion_service = IngestionService(db)
 portfolio_service = PortfolioService(db)
 
+FORECAST_BATCH_LIMIT = int(os.environ.get('FORECAST_BATCH_LIMIT', '50'))
+# Rows serialized per chunk when streaming /api/historical
+HISTORICAL_STREAM_BATCH = 500
+# Decimals kept in forecast prices; the float32 price cache carries noise
+# past roughly seven significant digits
+FORECAST_DECIMALS = 4
+# Worker processes for /api/evaluate; 1 or less evaluates in-process
+EVALUATE_WORKERS = int(os.environ.get(
+    'EVALUATE_WORKERS', str(min(len(TRADITIONAL_MODELS), os.cpu_count() or 1))))
+
+# Workers are started from a clean server process rather than forked from
+# this multi-threaded one, where a lock held at fork time would deadlock them
+EVALUATE_START_METHOD = ('forkserver' if 'forkserver' in multiprocessing.get_all_start_methods()
+                         else 'spawn')
+
+_eval_pool: Optional[ProcessPoolExecutor] = None
+_eval_pool_lock = threading.Lock()
+
+# symbol -> (data_version, dates, close prices)
+HISTORY_CACHE = LRUCache(maxsize=128)
+# (dataset, symbol) -> (data_version, encoded JSON body) for read-only GETs
+RESPONSE_CACHE = LRUCache(maxsize=256)
+# Historical and forecast bodies larger than this are not kept
+RESPONSE_CACHE_MAX_BYTES = 1 << 20
+# Most recent rows loaded for forecasting/evaluation; 0 loads the full history
+HISTORY_WINDOW = int(os.environ.get('HISTORY_WINDOW', '2048'))
+
+# Symbols only change on ingestion; clients and this process may reuse
+# the list for this many seconds
+METADATA_MAX_AGE = 60
+# 'symbols' -> (symbols, etag)
+SYMBOLS_CACHE = LRUCache(maxsize=1, ttl=METADATA_MAX_AGE)
+# (payload, etag) for /api/models, built on first request
+_models_response = None
+
+# (symbol, model_name) -> (prices the model was fitted on, model, takes_history)
+FITTED_MODELS = LRUCache(maxsize=32)
+# (symbol, model_name) -> [lock, requests holding or waiting on it]; an
+# entry lives only while a fit for that pair is in progress
+_fit_locks = {}
+_fit_locks_guard = threading.Lock()
+
+
+def _load_prices(symbol: str):
+    """
+    Return (dates, prices) for a symbol, reusing the cached copy
+    until the symbol's data version changes.
+    """
+    # Read the version before the rows so a concurrent write can only
+    # cause an extra reload, never a stale cache entry.
+    version = db.get_data_version(symbol)
+    cached = HISTORY_CACHE.get(symbol)
+    if cached is not None and cached[0] == version:
+        return cached[1], cached[2]
+
+    # float32 halves the cached footprint; callers upcast to float64 before
+    # fitting or predicting, so models never accumulate in float32.
+    columns = db.get_historical_columns(symbol, ('date', 'close'), limit=HISTORY_WINDOW)
+    dates = columns['date']
+    prices = columns['close'].astype(np.float32)
+    # Shared between requests, so guard against in-place modification
+    dates.setflags(write=False)
+    prices.setflags(write=False)
+    HISTORY_CACHE.set(symbol, (version, dates, prices))
+    return dates, prices
+
+
+def _data_etag(symbol: str, dataset: str, version: Optional[int] = None) -> str:
+    """ETag for a symbol's dataset, derived from its change counter."""
+    if version is None:
+        version = db.get_data_version(symbol, dataset)
+    return hashlib.md5(f'{symbol}:{dataset}:{version}'.encode()).hexdigest()
+
+
+def _cached_body(dataset: str, symbol: str, version: int) -> Optional[bytes]:
+    """Encoded response body for a symbol's dataset, if cached at ``version``."""
+    cached = RESPONSE_CACHE.get((dataset, symbol))
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    return None
+
+
+def _body_response(body, etag: str):
+    """JSON response for a pre-encoded (or streamed) body, revalidated by ETag."""
+    response = app.response_class(body, mimetype=app.json.mimetype)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+def _not_modified(etag: str):
+    """Return a 304 response when the client already holds ``etag``."""
+    if etag not in request.if_none_match:
+        return None
+    response = app.response_class(status=304)
+    response.set_etag(etag)
+    return response
+
+
+def _metadata_response(payload: dict, etag: str):
+    """JSON response for slow-changing metadata, honouring If-None-Match."""
+    response = _not_modified(etag) or jsonify(payload)
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = f'public, max-age={METADATA_MAX_AGE}'
+    return response
+
 
 @app.route('/')
 def index():
@@ -92,6 +259,7 @@ def trigger_ingestion():
             result = ingestion_service.ingest(symbol)
         else:
             result = ingestion_service.ingest_all()
+        SYMBOLS_CACHE.clear()
         return jsonify({'status': 'ok', 'result': result})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -144,6 +312,7 @@ def activate_model_version():
         return jsonify({'error': 'symbol, model, and version required'}), 400
     try:
         db.set_active_model_version(symbol, model_name, version)
+        adaptive_service.invalidate_model_cache(symbol, model_name)
         return jsonify({'status': 'ok'})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -153,21 +322,67 @@ def activate_model_version():
 def get_symbols():
     """Get available symbols."""
     try:
-        symbols = db.get_available_symbols()
-        return jsonify({'symbols': symbols})
+        cached = SYMBOLS_CACHE.get('symbols')
+        if cached is None:
+            symbols = db.get_available_symbols()
+            etag = hashlib.md5('\n'.join(symbols).encode()).hexdigest()
+            cached = (symbols, etag)
+            SYMBOLS_CACHE.set('symbols', cached)
+        symbols, etag = cached
+        return _metadata_response({'symbols': symbols}, etag)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
 @app.route('/api/historical/<symbol>')
 def get_historical(symbol):
-    """Get historical data for a symbol."""
+    """Get historical data for a symbol, streamed in row batches."""
     try:
-        data = db.get_historical_data(symbol)
-        return jsonify({'data': data})
+        # Version first: a concurrent write can only make the cached body miss
+        version = db.get_data_version(symbol, 'historical')
+        etag = _data_etag(symbol, 'historical', version)
+        cached = _not_modified(etag)
+        if cached is not None:
+            return cached
+        body = _cached_body('historical', symbol, version)
+        if body is not None:
+            return _body_response(body, etag)
+        rows = db.iter_historical_data(symbol)
+        # Pull the first row here so query errors still surface as a 500
+        first = next(rows, None)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+    def encode():
+        yield b'{"data":['
+        if first is not None:
+            batch = [first]
+            separator = b''
+            for row in rows:
+                batch.append(row)
+                if len(batch) >= HISTORICAL_STREAM_BATCH:
+                    yield separator + app.json.dumps(batch)[1:-1].encode()
+                    separator = b','
+                    batch = []
+            if batch:
+                yield separator + app.json.dumps(batch)[1:-1].encode()
+        yield b']}\n'
+
+    def generate():
+        # Keep the streamed chunks so the next request can skip the query
+        chunks, size = [], 0
+        for chunk in encode():
+            yield chunk
+            if chunks is not None:
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > RESPONSE_CACHE_MAX_BYTES:
+                    chunks = None
+        if chunks is not None:
+            RESPONSE_CACHE.set(('historical', symbol), (version, b''.join(chunks)))
+
+    return _body_response(stream_with_context(generate()), etag)
+
 
 @app.route('/api/errors/<symbol>')
 def get_error_series(symbol):
@@ -199,6 +414,321 @@ def get_rolling_metrics(symbol):
         return jsonify({'error': str(e)}), 500
 
 
+def _get_eval_pool() -> Optional[ProcessPoolExecutor]:
+    """Return the shared evaluation pool, creating it on first use."""
+    global _eval_pool
+    if EVALUATE_WORKERS <= 1:
+        return None
+    with _eval_pool_lock:
+        if _eval_pool is None:
+            _eval_pool = ProcessPoolExecutor(
+                max_workers=EVALUATE_WORKERS,
+                mp_context=multiprocessing.get_context(EVALUATE_START_METHOD))
+        return _eval_pool
+
+
+def _discard_eval_pool() -> None:
+    """Drop a broken pool so the next request starts a fresh one."""
+    global _eval_pool
+    with _eval_pool_lock:
+        if _eval_pool is not None:
+            _eval_pool.shutdown(wait=False, cancel_futures=True)
+            _eval_pool = None
+
+
+def _neural_models():
+    """Return the neural model factories, loading them on first call."""
+    global _NEURAL_MODELS
+    if _NEURAL_MODELS is None:
+        from models import get_neural_factories
+        _NEURAL_MODELS = get_neural_factories()
+    return _NEURAL_MODELS
+
+
+def _eval_model_specs():
+    """(model_key, model_type) pairs evaluated by /api/evaluate, in response order."""
+    global _EVAL_MODEL_SPECS
+    if _EVAL_MODEL_SPECS is None:
+        _EVAL_MODEL_SPECS = (
+            [(key, 'traditional') for key in TRADITIONAL_MODELS]
+            + [(key, 'neural') for key in _neural_models()]
+        )
+    return _EVAL_MODEL_SPECS
+
+
+def _warmup_models():
+    """
+    Fit and predict each traditional model once on a dummy series so the
+    JIT kernels compile (or load from their on-disk cache) and lazy
+    statsmodels imports happen before the first real request.
+    """
+    series = np.linspace(100.0, 110.0, 50)
+    for model_key, model_fn in TRADITIONAL_MODELS.items():
+        try:
+            model = model_fn()
+            model.evaluate(series[:-5], series[-5:])
+            model.fit(series)
+            model.predict(steps=1)
+        except Exception:
+            LOGGER.exception("Warmup failed for %s", model_key)
+
+
+# Joined by gunicorn's pre_fork hook so preloaded workers inherit the warm state
+_warmup_thread: Optional[threading.Thread] = None
+if os.environ.get('MODEL_WARMUP', '1') == '1':
+    _warmup_thread = threading.Thread(target=_warmup_models, name='model-warmup', daemon=True)
+    _warmup_thread.start()
+
+
+def _evaluate_all(train, test):
+    """
+    Evaluate every registered model on a train/test split.
+
+    Traditional models are fitted concurrently in the process pool; neural
+    models stay in this process since TensorFlow does not survive a fork,
+    and are evaluated while the pool works. Falls back to in-process
+    evaluation when the pool is unavailable. Results keep registry order.
+    """
+    futures = {}
+    pool = _get_eval_pool()
+    if pool is not None:
+        try:
+            futures = {key: pool.submit(evaluate_model, key, train, test)
+                       for key, model_type in _eval_model_specs()
+                       if model_type == 'traditional'}
+        except (BrokenProcessPool, RuntimeError, OSError) as e:
+            LOGGER.warning("Evaluation pool unavailable, running in-process: %s", e)
+            _discard_eval_pool()
+            futures = {}
+
+    def in_process(model_key, model_type):
+        try:
+            return evaluate_model(model_key, train, test, model_type=model_type)
+        except Exception:
+            LOGGER.exception("Error evaluating %s", model_key)
+            return None
+
+    # Models the pool isn't handling run here first, overlapping the workers
+    results = {
+        model_key: in_process(model_key, model_type)
+        for model_key, model_type in _eval_model_specs()
+        if model_key not in futures
+    }
+    for model_key, model_type in _eval_model_specs():
+        future = futures.get(model_key)
+        if future is None:
+            continue
+        try:
+            results[model_key] = future.result()
+        except BrokenProcessPool:
+            _discard_eval_pool()
+            results[model_key] = in_process(model_key, model_type)
+        except Exception:
+            LOGGER.exception("Error evaluating %s", model_key)
+
+    return [results[key] for key, _ in _eval_model_specs() if results.get(key) is not None]
+
+
+def _select_best_model(results):
+    """
+    Pick the best evaluation result in one pass: lowest RMSE, with MAE and
+    then MAPE breaking ties. Missing or NaN metrics rank last.
+    """
+    def metric(result, name):
+        value = result.get(name)
+        return value if value is not None and value == value else math.inf
+
+    best = None
+    best_rmse = math.inf
+    for result in results:
+        rmse = metric(result, 'rmse')
+        if best is None or rmse < best_rmse:
+            best, best_rmse = result, rmse
+        elif rmse == best_rmse:
+            # Only tied RMSE values pay for the secondary comparisons
+            if ((metric(result, 'mae'), metric(result, 'mape'))
+                    < (metric(best, 'mae'), metric(best, 'mape'))):
+                best = result
+    return best
+
+
+def _fit_adhoc_model(symbol: str, model_name: str, prices):
+    """
+    Return (model, takes_history) fitted on ``prices``, or None for an
+    unknown model name.
+
+    ``prices`` is the read-only array from _load_prices, which is replaced
+    whenever the symbol's data changes, so an identity check tells whether
+    a cached fit is still current. Concurrent requests for the same
+    symbol/model wait for one fit instead of each training their own.
+    """
+    if model_name in TRADITIONAL_MODELS:
+        factory = TRADITIONAL_MODELS[model_name]
+    elif model_name in _neural_models():
+        factory = _neural_models()[model_name]
+    else:
+        return None
+
+    key = (symbol, model_name)
+    cached = FITTED_MODELS.get(key)
+    if cached is not None and cached[0] is prices:
+        return cached[1], cached[2]
+
+    with _fit_locks_guard:
+        entry = _fit_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            cached = FITTED_MODELS.get(key)
+            if cached is not None and cached[0] is prices:
+                return cached[1], cached[2]
+
+            # Graceful fallback for neural models if data is short
+            model = factory()
+            takes_history = model_name not in TRADITIONAL_MODELS
+            if takes_history and len(prices) < getattr(model, 'lookback', 10) + 5:
+                model = TRADITIONAL_MODELS['arima']()
+                takes_history = False
+            model.fit(prices.astype(np.float64))
+            if takes_history:
+                try:
+                    model.quantize()
+                except Exception as e:
+                    LOGGER.warning("TFLite conversion failed for %s/%s, using Keras: %s",
+                                   symbol, model_name, e)
+            FITTED_MODELS.set(key, (prices, model, takes_history))
+            return model, takes_history
+    finally:
+        with _fit_locks_guard:
+            entry[1] -= 1
+            if not entry[1]:
+                del _fit_locks[key]
+
+
+def _forecast_one(symbol: str, model_name: str, horizon_hours: int, registry_models=None):
+    """
+    Build the forecast payload for one symbol/model pair.
+
+    Returns (payload, status_code). Forecast rows are not persisted here;
+    callers save successful payloads with _save_forecasts.
+
+    Args:
+        registry_models: Optional dict memoizing registry lookups by
+            (symbol, model_name) across the items of a batch request.
+    """
+    # Get historical dates and close prices
+    dates, prices = _load_prices(symbol)
+    if len(dates) == 0:
+        return {'error': f'No data found for {symbol}'}, 404
+    
+    if len(prices) < 5:
+        return {'error': 'Insufficient historical data for forecasting'}, 400
+    
+    # Calculate number of steps (assuming daily data, convert hours to days)
+    steps = max(1, math.ceil(horizon_hours / 24))
+    step_hours = round(horizon_hours / steps, 2)
+    
+    registry_key = (symbol, model_name)
+    if registry_models is not None and registry_key in registry_models:
+        loaded_model, version_meta = registry_models[registry_key]
+    else:
+        version_meta = None
+        try:
+            loaded_model, version_meta = adaptive_service.load_active_model(symbol, model_name)
+        except Exception:
+            loaded_model = None
+        if registry_models is not None:
+            registry_models[registry_key] = (loaded_model, version_meta)
+
+    # The cached float32 array stays the fit-cache key; models see float64
+    series = prices.astype(np.float64)
+    if loaded_model:
+        model = loaded_model
+        predictions, confidence = adaptive_service.predict_with_model(model, series, steps)
+    else:
+        fitted = _fit_adhoc_model(symbol, model_name, prices)
+        if fitted is None:
+            return {'error': f'Unknown model: {model_name}'}, 400
+        model, takes_history = fitted
+        if takes_history:
+            predictions, confidence = model.predict(series, steps=steps)
+        else:
+            predictions, confidence = model.predict(steps=steps)
+
+    model_version = version_meta.get('version') if version_meta else None
+    model_source = 'registry' if version_meta else 'adhoc'
+    model_display_name = getattr(model, 'name', model_name)
+    
+    # Generate forecast dates
+    last_date_str = str(dates[-1])
+    last_date = np.datetime64(last_date_str, 's')
+    step_seconds = int(round(step_hours * 3600))
+    forecast_dts = last_date + np.arange(1, steps + 1) * np.timedelta64(step_seconds, 's')
+    # Use ISO-like strings; include time component for sub-daily horizons
+    day_strings = np.datetime_as_string(forecast_dts, unit='D')
+    on_midnight = forecast_dts.astype('datetime64[m]') == forecast_dts.astype('datetime64[D]')
+    if on_midnight.all():
+        # Daily steps: skip formatting a minute-resolution copy
+        forecast_dates = day_strings.tolist()
+    else:
+        minute_strings = np.char.replace(np.datetime_as_string(forecast_dts, unit='m'), 'T', ' ')
+        forecast_dates = np.where(on_midnight, day_strings, minute_strings).tolist()
+    
+    # Prepare forecast response
+    try:
+        confidence_band = float(confidence)
+    except (TypeError, ValueError):
+        confidence_band = 0.0
+    volatility = confidence_band * 0.5
+
+    # Estimate OHLC based on prediction and volatility, one array op per field.
+    # tolist() unboxes each column in a single call; both JSON providers
+    # accept NumPy scalars, but orjson encodes plain floats faster.
+    preds = np.asarray(predictions, dtype=np.float64)
+    closes = preds.round(FORECAST_DECIMALS).tolist()
+    opens = (preds - volatility * 0.3).round(FORECAST_DECIMALS).tolist()
+    highs = (preds + volatility).round(FORECAST_DECIMALS).tolist()
+    lows = (preds - volatility).round(FORECAST_DECIMALS).tolist()
+    lowers = (preds - confidence_band).round(FORECAST_DECIMALS).tolist()
+    uppers = (preds + confidence_band).round(FORECAST_DECIMALS).tolist()
+
+    forecasts = [
+        {
+            'date': date,
+            'horizon_hours': horizon_hours,
+            'step_hours': step_hours,
+            'model_version': model_version,
+            'predicted_open': open_,
+            'predicted_high': high,
+            'predicted_low': low,
+            'predicted_close': close,
+            'confidence_lower': lower,
+            'confidence_upper': upper
+        }
+        for date, open_, high, low, close, lower, upper
+        in zip(forecast_dates, opens, highs, lows, closes, lowers, uppers)
+    ]
+    
+    return {
+        'symbol': symbol,
+        'model': model_display_name,
+        'model_version': model_version,
+        'model_source': model_source,
+        'horizon_hours': horizon_hours,
+        'forecasts': forecasts
+    }, 200
+
+
+def _save_forecasts(payload: dict):
+    """Persist the forecast rows of a successful _forecast_one payload."""
+    db.insert_forecasts_bulk(
+        symbol=payload['symbol'],
+        model_name=payload['model'],
+        horizon_hours=payload['horizon_hours'],
+        rows=payload['forecasts']
+    )
+
+
 @app.route('/api/forecast', methods=['POST'])
 def generate_forecast():
     """
@@ -220,121 +750,94 @@ def generate_forecast():
         if not symbol:
             return jsonify({'error': 'Symbol required'}), 400
         
-        # Get historical data
-        historical = db.get_historical_data(symbol)
-        if not historical:
-            return jsonify({'error': f'No data found for {symbol}'}), 404
-        
-        # Extract close prices
-        prices = np.array([d['close'] for d in historical], dtype=float)
-        if len(prices) < 5:
-            return jsonify({'error': 'Insufficient historical data for forecasting'}), 400
+        payload, status = _forecast_one(symbol, model_name, horizon_hours)
+        if status == 200:
+            _save_forecasts(payload)
+        return jsonify(payload), status
         
-        # Calculate number of steps (assuming daily data, convert hours to days)
-        steps = max(1, math.ceil(horizon_hours / 24))
-        step_hours = round(horizon_hours / steps, 2)
-        
-        version_meta = None
-        try:
-            loaded_model, version_meta = adaptive_service.load_active_model(symbol, model_name)
-        except Exception:
-            loaded_model = None
+    except Exception as e:
+        LOGGER.exception("Forecast failed")
+        return jsonify({'error': str(e)}), 500
 
-        if loaded_model:
-            model = loaded_model
-            predictions, confidence = adaptive_service.predict_with_model(model, prices, steps)
-        else:
-            # Select model (with graceful fallback for neural models if data is short)
-            if model_name in TRADITIONAL_MODELS:
-                model = TRADITIONAL_MODELS[model_name]()
-                model.fit(prices)
-                predictions, confidence = model.predict(steps=steps)
-            elif model_name in NEURAL_MODELS:
-                candidate = NEURAL_MODELS[model_name]()
-                required_len = getattr(candidate, 'lookback', 10) + 5
-                if len(prices) < required_len:
-                    model = TRADITIONAL_MODELS['arima']()
-                    model.fit(prices)
-                    predictions, confidence = model.predict(steps=steps)
-                else:
-                    model = candidate
-                    model.fit(prices)
-                    predictions, confidence = model.predict(prices, steps=steps)
-            else:
-                return jsonify({'error': f'Unknown model: {model_name}'}), 400
-
-        model_version = version_meta.get('version') if version_meta else None
-        model_source = 'registry' if version_meta else 'adhoc'
-        model_display_name = getattr(model, 'name', model_name)
-        
-        # Generate forecast dates
-        last_date_str = historical[-1]['date']
-        last_date = datetime.strptime(last_date_str, '%Y-%m-%d')
-        forecast_dates = []
-        for i in range(steps):
-            delta_hours = step_hours * (i + 1)
-            forecast_dt = last_date + timedelta(hours=delta_hours)
-            # Use ISO-like strings; include time component for sub-daily horizons
-            if forecast_dt.hour == 0 and forecast_dt.minute == 0:
-                forecast_dates.append(forecast_dt.strftime('%Y-%m-%d'))
-            else:
-                forecast_dates.append(forecast_dt.strftime('%Y-%m-%d %H:%M'))
-        
-        # Prepare forecast response
-        forecasts = []
+
+@app.route('/api/forecast/batch', methods=['POST'])
+def generate_forecast_batch():
+    """
+    Generate forecasts for several symbol/model pairs in one request.
+    
+    Request JSON:
+    {
+        "requests": [
+            {"id": "1", "symbol": "AAPL", "model": "arima", "horizon_hours": 24},
+            {"id": "2", "symbol": "MSFT", "model": "lstm", "horizon_hours": 48}
+        ]
+    }
+    
+    Each entry of the returned "responses" list carries the item's id, the
+    HTTP status it would have had as a single request, and its body.
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
+    items = data.get('requests')
+    if not isinstance(items, list) or not items:
+        return jsonify({'error': 'requests must be a non-empty list'}), 400
+    if len(items) > FORECAST_BATCH_LIMIT:
+        return jsonify({'error': f'At most {FORECAST_BATCH_LIMIT} requests per batch'}), 400
+
+    responses = []
+    completed = []
+    registry_models = {}
+    for index, item in enumerate(items):
+        item = item if isinstance(item, dict) else {}
+        item_id = str(item.get('id', index))
+        symbol = item.get('symbol')
+        if not symbol:
+            responses.append({'id': item_id, 'status': 400, 'body': {'error': 'Symbol required'}})
+            continue
+        try:
+            horizon_hours = max(1, int(item.get('horizon_hours', 24)))
+        except (ValueError, TypeError):
+            responses.append({'id': item_id, 'status': 400,
+                              'body': {'error': 'horizon_hours must be an integer'}})
+            continue
         try:
-            confidence_band = float(confidence)
-        except (TypeError, ValueError):
-            confidence_band = 0.0
-        volatility_base = confidence_band * 0.5
-
-        for i, (date, pred) in enumerate(zip(forecast_dates, predictions)):
-            # Estimate OHLC based on prediction and volatility
-            volatility = volatility_base
-            forecast_item = {
-                'date': date,
-                'horizon_hours': horizon_hours,
-                'step_hours': step_hours,
-                'model_version': model_version,
-                'predicted_open': float(pred - volatility * 0.3),
-                'predicted_high': float(pred + volatility),
-                'predicted_low': float(pred - volatility),
-                'predicted_close': float(pred),
-                'confidence_lower': float(pred - confidence_band),
-                'confidence_upper': float(pred + confidence_band)
-            }
-            forecasts.append(forecast_item)
-            
-            # Save to database
-            db.insert_forecast(
-                symbol=symbol,
-                model_name=model.name,
-                forecast_date=date,
-                horizon_hours=horizon_hours,
-                predictions=forecast_item
+            payload, status = _forecast_one(
+                symbol,
+                item.get('model', 'arima'),
+                horizon_hours,
+                registry_models=registry_models
             )
-        
-        return jsonify({
-            'symbol': symbol,
-            'model': model_display_name,
-            'model_version': model_version,
-            'model_source': model_source,
-            'horizon_hours': horizon_hours,
-            'forecasts': forecasts
-        })
-        
-    except Exception as e:
-        import traceback
-        traceback.print_exc()
-        return jsonify({'error': str(e)}), 500
+        except Exception as e:
+            LOGGER.exception("Batch forecast item failed")
+            payload, status = {'error': str(e)}, 500
+        if status == 200:
+            completed.append(payload)
+        responses.append({'id': item_id, 'status': status, 'body': payload})
+
+    # Persist after all items are computed so storage work is done in one pass
+    for payload in completed:
+        _save_forecasts(payload)
+
+    return jsonify({'responses': responses})
 
 
 @app.route('/api/forecasts/<symbol>')
 def get_saved_forecasts(symbol: str):
     """Return previously saved forecasts for a symbol (all models)."""
     try:
-        rows = db.get_forecasts(symbol)
-        return jsonify({'forecasts': rows})
+        version = db.get_data_version(symbol, 'forecasts')
+        etag = _data_etag(symbol, 'forecasts', version)
+        cached = _not_modified(etag)
+        if cached is not None:
+            return cached
+        body = _cached_body('forecasts', symbol, version)
+        if body is None:
+            # Row dicts are only built when the forecasts changed
+            body = app.json.dumps({'forecasts': db.get_forecasts(symbol)}).encode() + b'\n'
+            if len(body) <= RESPONSE_CACHE_MAX_BYTES:
+                RESPONSE_CACHE.set(('forecasts', symbol), (version, body))
+        return _body_response(body, etag)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -358,13 +861,11 @@ def evaluate_models():
         if not symbol:
             return jsonify({'error': 'Symbol required'}), 400
         
-        # Get historical data
-        historical = db.get_historical_data(symbol)
-        if not historical:
+        # Get historical dates and close prices
+        dates, prices = _load_prices(symbol)
+        if len(dates) == 0:
             return jsonify({'error': f'No data found for {symbol}'}), 404
         
-        prices = np.array([d['close'] for d in historical])
-        
         if len(prices) < test_size + 10:
             # Adapt test window for shorter histories
             adaptive_size = max(2, len(prices) // 3)
@@ -374,51 +875,27 @@ def evaluate_models():
         if len(prices) < test_size + 5 or test_size < 2:
             return jsonify({'error': 'Insufficient data for evaluation'}), 400
         
-        # Split data
-        train = prices[:-test_size]
-        test = prices[-test_size:]
+        # Upcast the cached float32 prices once; every model then works on
+        # read-only float64 views of the same buffer instead of converting
+        # its own copy
+        series = prices.astype(np.float64)
+        series.setflags(write=False)
+        train = series[:-test_size]
+        test = series[-test_size:]
         
         # Evaluate all models
-        results = []
+        results = _evaluate_all(train, test)
         
-        # Traditional models
-        for model_key, model_fn in TRADITIONAL_MODELS.items():
-            try:
-                model = model_fn()
-                metrics = model.evaluate(train, test)
-                metrics['model_name'] = getattr(model, 'name', model_key)
-                metrics['model_type'] = 'traditional'
-                results.append(metrics)
-                
-                # Save metrics to database
-                db.save_model_metrics(symbol, model.name, metrics)
-            except Exception as e:
-                print(f"Error evaluating {model_key}: {e}")
-        
-        # Neural models
-        for model_key, model_fn in NEURAL_MODELS.items():
-            try:
-                model = model_fn()
-                metrics = model.evaluate(train, test)
-                metrics['model_name'] = getattr(model, 'name', model_key)
-                metrics['model_type'] = 'neural'
-                results.append(metrics)
-                
-                # Save metrics to database
-                db.save_model_metrics(symbol, model.name, metrics)
-            except Exception as e:
-                print(f"Error evaluating {model_key}: {e}")
+        # Save metrics to database in one write
+        try:
+            db.save_model_metrics_bulk(symbol, results)
+        except Exception:
+            LOGGER.exception("Error saving metrics for %s", symbol)
         
         if not results:
             return jsonify({'error': 'No models produced evaluation metrics'}), 500
         
-        # Determine best model (prioritize RMSE, then MAE, then MAPE)
-        best_model = min(
-            results,
-            key=lambda m: (m.get('rmse', float('inf')),
-                           m.get('mae', float('inf')),
-                           m.get('mape', float('inf')))
-        )
+        best_model = _select_best_model(results)
         
         return jsonify({
             'symbol': symbol,
@@ -428,8 +905,7 @@ def evaluate_models():
         })
         
     except Exception as e:
-        import traceback
-        traceback.print_exc()
+        LOGGER.exception("Evaluation failed")
         return jsonify({'error': str(e)}), 500
 
 
@@ -437,8 +913,17 @@ def evaluate_models():
 def get_metrics(symbol):
     """Get model performance metrics for a symbol."""
     try:
-        metrics = db.get_model_metrics(symbol)
-        return jsonify({'metrics': metrics})
+        version = db.get_data_version(symbol, 'metrics')
+        etag = _data_etag(symbol, 'metrics', version)
+        cached = _not_modified(etag)
+        if cached is not None:
+            return cached
+        body = _cached_body('metrics', symbol, version)
+        if body is None:
+            body = app.json.dumps({'metrics': db.get_model_metrics(symbol)}).encode() + b'\n'
+            if len(body) <= RESPONSE_CACHE_MAX_BYTES:
+                RESPONSE_CACHE.set(('metrics', symbol), (version, body))
+        return _body_response(body, etag)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -446,12 +931,16 @@ def get_metrics(symbol):
 @app.route('/api/models')
 def get_available_models():
     """Get list of available models."""
-    models = {
-        'traditional': list(TRADITIONAL_MODELS.keys()),
-        'neural': list(NEURAL_MODELS.keys()) if KERAS_AVAILABLE else [],
-        'all': adaptive_service.get_available_models()
-    }
-    return jsonify(models)
+    global _models_response
+    if _models_response is None:
+        models = {
+            'traditional': list(TRADITIONAL_MODELS.keys()),
+            'neural': list(_neural_models().keys()),
+            'all': adaptive_service.get_available_models()
+        }
+        etag = hashlib.md5(app.json.dumps(models).encode()).hexdigest()
+        _models_response = (models, etag)
+    return _metadata_response(*_models_response)
 
 
 @app.route('/api/portfolio/summary')
@@ -494,4 +983,6 @@ def portfolio_trade():
 
 
 if __name__ == '__main__':
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    # Development server; production runs under gunicorn via app/wsgi.py
+    app.run(debug=os.environ.get('FLASK_DEV', '0') == '1',
+            host='0.0.0.0', port=int(os.environ.get('PORT', 5000)))
@@ -0,0 +1,23 @@
+"""
+WSGI entry point for production servers.
+
+Run from the project root, e.g.:
+    gunicorn -w 4 -k gthread --threads 8 -b 0.0.0.0:5000 app.wsgi:application
+"""
+
+import os
+import sys
+
+# One BLAS/OpenMP/TensorFlow compute thread per request thread: every worker
+# fits models concurrently, so library thread pools sized to the core count
+# would oversubscribe the CPU. Must run before NumPy is imported; explicit
+# environment settings win.
+for _var in ('OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS',
+             'NUMEXPR_NUM_THREADS', 'TF_NUM_INTRAOP_THREADS'):
+    os.environ.setdefault(_var, '1')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.app import app
+
+application = app
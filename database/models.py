@@ -3,31 +3,409 @@ Database models for the FinTech forecasting application.
 Uses SQLite for simplicity and portability.
 """
 
+import atexit
 import sqlite3
+from contextlib import contextmanager
+import threading
+import time
+import weakref
 from datetime import datetime
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterator, Tuple
 import json
 import os
 
+import numpy as np
+
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+try:
+    import zstandard
+    ZSTD_AVAILABLE = True
+except ImportError:
+    ZSTD_AVAILABLE = False
+
+# Opt-in: compressed rows are BLOBs that need zstandard to read back and that
+# SQL JSON functions cannot parse, so by default JSON is always stored as text
+JSON_COMPRESS = os.environ.get('JSON_COMPRESS', '0') == '1'
+# With JSON_COMPRESS, payloads at least this large are zstd-compressed
+JSON_COMPRESS_MIN_BYTES = 1024
+# Every zstd frame starts with this; JSON text never does
+_ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+# Bump whenever _create_schema changes so existing files are upgraded on open
+SCHEMA_VERSION = 4
+
+# Per-connection settings; journal_mode=WAL is persistent and set once per file
+CONNECTION_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA mmap_size=268435456",
+    "PRAGMA cache_size=-64000",
+    "PRAGMA temp_store=MEMORY",
+    # Off by default in SQLite; enforces the portfolio ON DELETE CASCADE links
+    "PRAGMA foreign_keys=ON",
+    # How long a writer waits on another process's write lock before SQLITE_BUSY
+    f"PRAGMA busy_timeout={int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', '5000'))}",
+)
+
+
+# Columns of historical_prices that can be fetched column-wise
+HISTORICAL_FIELDS = ('date', 'open', 'high', 'low', 'close', 'volume',
+                     'return_1d', 'vol_5d', 'sma_5', 'sma_20')
+# NOT NULL columns a historical row must provide
+HISTORICAL_REQUIRED = ('date', 'open', 'high', 'low', 'close')
+# Append-mostly tables that can be mirrored to Parquet for offline scans
+PARQUET_TABLES = ('historical_prices', 'sentiment_data', 'forecasts', 'metrics_history')
+# Columns derived from ``close`` when a row does not supply them
+HISTORICAL_FEATURES = ('return_1d', 'vol_5d', 'sma_5', 'sma_20')
+
+
+def check_historical_fields(fields: Tuple[str, ...]) -> None:
+    """Reject anything outside the historical_prices column whitelist."""
+    unknown = [field for field in fields if field not in HISTORICAL_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown historical fields: {unknown}")
+
+
+def historical_column(field: str, values: Iterator[Any], count: int) -> np.ndarray:
+    """Build one column array: strings for ``date``, float64 (NULL -> NaN) otherwise."""
+    if field == 'date':
+        return np.array(list(values), dtype=str)
+    return np.fromiter((np.nan if v is None else v for v in values),
+                       dtype=np.float64, count=count)
+
+
+def _rolling(values: np.ndarray, window: int, reduce) -> np.ndarray:
+    """Apply ``reduce`` over trailing windows; the first ``window - 1`` entries are NaN."""
+    out = np.full(values.shape[0], np.nan)
+    if values.shape[0] >= window:
+        windows = np.lib.stride_tricks.sliding_window_view(values, window)
+        out[window - 1:] = reduce(windows, axis=1)
+    return out
+
+
+def historical_features(close: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Compute the derived price features for a date-ordered close series.
+
+    Matches pandas: ``pct_change()`` for return_1d, ``rolling(5).std()`` of
+    the returns for vol_5d and ``rolling(n).mean()`` for the SMAs, with NaN
+    where a window is incomplete.
+    """
+    close = np.asarray(close, dtype=np.float64)
+    returns = np.full(close.shape[0], np.nan)
+    returns[1:] = close[1:] / close[:-1] - 1.0
+    vol = np.full(close.shape[0], np.nan)
+    vol[1:] = _rolling(returns[1:], 5, lambda w, axis: w.std(axis=axis, ddof=1))
+    return {
+        'return_1d': returns,
+        'vol_5d': vol,
+        'sma_5': _rolling(close, 5, np.mean),
+        'sma_20': _rolling(close, 20, np.mean),
+    }
+
+
+def fill_historical_features(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Return ``rows`` with missing derived features computed over the batch.
+
+    The batch is put in date order first; values a row already supplies are
+    kept, and features whose window is incomplete stay None.
+    """
+    if all(row.get(field) is not None for row in rows for field in HISTORICAL_FEATURES):
+        return rows
+    order = np.argsort([str(row['date']) for row in rows], kind='stable').tolist()
+    close = np.fromiter((rows[i]['close'] for i in order), dtype=np.float64, count=len(rows))
+    computed = {
+        field: [None if np.isnan(v) else v for v in values.tolist()]
+        for field, values in historical_features(close).items()
+    }
+    filled = list(rows)
+    for position, index in enumerate(order):
+        row = rows[index]
+        missing = {field: computed[field][position]
+                   for field in HISTORICAL_FEATURES if row.get(field) is None}
+        if missing:
+            filled[index] = {**row, **missing}
+    return filled
+
+
+def historical_frame(columns: Dict[str, np.ndarray]):
+    """Wrap column arrays in a DataFrame, parsing ``date``; pandas is imported on demand."""
+    import pandas as pd
+    frame = pd.DataFrame(columns, copy=False)
+    if 'date' in frame:
+        frame['date'] = pd.to_datetime(frame['date'])
+    return frame
+
+
+def _json_dumps(value: Dict[str, Any]):
+    """Encode a dict parameter as JSON text, or as a zstd blob when JSON_COMPRESS is set and it is large."""
+    if ORJSON_AVAILABLE:
+        encoded = orjson.dumps(value, option=orjson.OPT_SERIALIZE_NUMPY)
+    else:
+        encoded = json.dumps(value).encode()
+    if JSON_COMPRESS and ZSTD_AVAILABLE and len(encoded) >= JSON_COMPRESS_MIN_BYTES:
+        # Compressor objects are not thread-safe; one per call is cheap
+        return zstandard.ZstdCompressor(level=3).compress(encoded)
+    return encoded.decode()
+
+
+def _json_loads(raw: bytes) -> Any:
+    """Decode a JSON column; rows written by json.dumps may hold NaN, which orjson rejects."""
+    if not raw:
+        return {}
+    if raw[:4] == _ZSTD_MAGIC:
+        if not ZSTD_AVAILABLE:
+            raise RuntimeError("zstandard is required to read compressed JSON columns")
+        raw = zstandard.ZstdDecompressor().decompress(raw)
+    if ORJSON_AVAILABLE:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            pass
+    return json.loads(raw)
+
+
+# JSON columns are encoded explicitly with _json_dumps at each write; columns
+# selected as "name [JSON]" are decoded on fetch (connections use PARSE_COLNAMES).
+sqlite3.register_converter("JSON", _json_loads)
+
+
+def _utc_timestamp() -> str:
+    """Current UTC time in the format CURRENT_TIMESTAMP stores."""
+    return datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S')
+
+
+class _PooledConnection(sqlite3.Connection):
+    """Connection reused by its thread; close() only ends an open transaction."""
+
+    def close(self):
+        if self.in_transaction:
+            self.rollback()
+
+    def dispose(self):
+        super().close()
+
+
+# Equity snapshots are buffered and written together by a
+# background thread once this many rows are pending or every this many seconds
+WRITE_BUFFER_ROWS = int(os.environ.get('WRITE_BUFFER_ROWS', '500'))
+WRITE_BUFFER_SECONDS = float(os.environ.get('WRITE_BUFFER_SECONDS', '1.0'))
+# Past this many pending rows the flusher has fallen behind and writers
+# flush themselves, so the buffer stays bounded
+WRITE_BUFFER_MAX_ROWS = 4 * WRITE_BUFFER_ROWS
+
+# How long get_available_symbols may serve its cached list; symbols this
+# process inserts show up at once, other processes' within this window
+SYMBOLS_CACHE_SECONDS = float(os.environ.get('SYMBOLS_CACHE_SECONDS', '60'))
+
+# Databases whose connections are closed at interpreter exit
+_open_databases = weakref.WeakSet()
+
+
+@atexit.register
+def _close_databases():
+    for database in list(_open_databases):
+        try:
+            database.close()
+        except Exception as e:
+            print(f"Error closing database {database.db_path}: {e}")
+
+
+def _flush_loop(database_ref, wanted: threading.Event):
+    """
+    Body of a Database's flusher thread.
+
+    Only a weak reference is held, so an abandoned Database can still be
+    collected; the thread exits once it is, or once it has been replaced.
+    """
+    while True:
+        wanted.wait(WRITE_BUFFER_SECONDS)
+        wanted.clear()
+        database = database_ref()
+        if database is None or database._flusher is not threading.current_thread():
+            return
+        try:
+            database.flush()
+        except Exception as e:
+            print(f"Error flushing buffered writes to {database.db_path}: {e}")
+        del database
+
 
 class Database:
     """Database manager for financial data and forecasts."""
+
+    # Trades are financial records and are always committed before returning
+    _INSERT_TRADE = """
+        INSERT INTO portfolio_trades
+        (portfolio_id, symbol, action, quantity, price, reason, created_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?)
+    """
+
+    # Append-only rows written through the buffer: name -> INSERT statement
+    _BUFFERED_INSERTS = {
+        'equity': """
+            INSERT INTO portfolio_equity
+            (portfolio_id, equity, cash, holdings_value, returns, volatility, sharpe, snapshot_time)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+    }
+    
+    # One statement text for single and bulk forecast writes, so both
+    # share the connection's cached prepared statement
+    _UPSERT_FORECAST = """
+        INSERT INTO forecasts 
+        (symbol, model_name, model_version, forecast_date, horizon_hours, 
+         predicted_open, predicted_high, predicted_low, predicted_close,
+         confidence_lower, confidence_upper)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ON CONFLICT(symbol, model_name, forecast_date, horizon_hours) DO UPDATE SET
+            model_version = excluded.model_version,
+            predicted_open = excluded.predicted_open, predicted_high = excluded.predicted_high,
+            predicted_low = excluded.predicted_low, predicted_close = excluded.predicted_close,
+            confidence_lower = excluded.confidence_lower,
+            confidence_upper = excluded.confidence_upper,
+            -- A revised forecast is pending evaluation again
+            created_at = CURRENT_TIMESTAMP, actual_close = NULL,
+            error_abs = NULL, error_pct = NULL, evaluated_at = NULL
+    """
     
     def __init__(self, db_path: str = "database/fintech.db"):
         """Initialize database connection."""
         self.db_path = db_path
+        self._local = threading.local()
+        # Every connection handed out, so close() can reach other threads' too
+        self._connections = weakref.WeakSet()
+        # Serializes this process's write transactions (SQLite allows one writer)
+        self._write_lock = threading.Lock()
+        # Pending buffered rows; _flush_lock is held from taking them to commit
+        self._buffers = {name: [] for name in self._BUFFERED_INSERTS}
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        # Background writer, started with the first buffered row
+        self._flusher: Optional[threading.Thread] = None
+        self._flush_wanted = threading.Event()
+        # (symbols, monotonic expiry) from the last get_available_symbols
+        self._symbols_cache: Optional[Tuple[Tuple[str, ...], float]] = None
         os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        # WAL lets readers proceed while a writer commits
+        self.get_connection().execute("PRAGMA journal_mode=WAL")
         self.init_schema()
+        _open_databases.add(self)
     
+    def reconnect(self):
+        """
+        Forget connections opened so far, e.g. in a forked worker process.
+
+        SQLite connections must not be shared across a fork, so each thread
+        of the child opens its own on next use. The inherited ones are left
+        open: closing them in the child could drop the parent's file locks.
+        """
+        self._local = threading.local()
+        self._connections = weakref.WeakSet()
+        # Threads do not survive a fork; the next buffered row starts a new flusher
+        self._flusher = None
+        self._flush_wanted = threading.Event()
+
+    def close(self):
+        """
+        Close every connection this instance has opened, in any thread.
+
+        Buffered rows are written first and the flusher thread is stopped;
+        rows that still cannot be written are reported, not raised, so the
+        connections are closed regardless. Runs at interpreter exit; later
+        calls open fresh connections.
+        """
+        with self._buffer_lock:
+            self._flusher = None
+        self._flush_wanted.set()
+        try:
+            self.flush()
+        except Exception as e:
+            with self._buffer_lock:
+                lost = sum(len(rows) for rows in self._buffers.values())
+                self._buffers = {name: [] for name in self._BUFFERED_INSERTS}
+            print(f"Error flushing {lost} buffered rows to {self.db_path} on close: {e}")
+        connections, self._connections = list(self._connections), weakref.WeakSet()
+        self._local = threading.local()
+        for conn in connections:
+            conn.dispose()
+
     def get_connection(self):
-        """Get database connection."""
-        return sqlite3.connect(self.db_path)
+        """
+        Get this thread's database connection, opening it on first use.
+
+        Connections stay open for the life of the thread; calling close()
+        on them just rolls back anything left uncommitted.
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            # Long-lived connections: keep every distinct statement compiled
+            # PARSE_COLNAMES only: PARSE_DECLTYPES would also turn the
+            # TIMESTAMP columns into datetime objects
+            conn = sqlite3.connect(self.db_path, factory=_PooledConnection,
+                                   check_same_thread=False, cached_statements=256,
+                                   detect_types=sqlite3.PARSE_COLNAMES)
+            for pragma in CONNECTION_PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+            self._connections.add(conn)
+        elif conn.in_transaction:
+            # A previous call failed before committing; don't let its
+            # partial writes ride along with the next commit.
+            conn.rollback()
+        return conn
     
+    @contextmanager
+    def write_transaction(self):
+        """
+        Run a write transaction on this thread's connection.
+
+        Writers in this process queue on a lock instead of polling SQLite's
+        busy handler; BEGIN IMMEDIATE then only waits on other processes.
+        Commits on success and rolls back if the block raises.
+        """
+        with self._write_lock:
+            conn = self.get_connection()
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
     def init_schema(self):
-        """Initialize database schema."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        """
+        Create or upgrade the schema.
+
+        ``PRAGMA user_version`` records the SCHEMA_VERSION a file has been
+        brought up to, so opening an up-to-date database is a single read.
+        """
+        if self._schema_version(self.get_connection()) >= SCHEMA_VERSION:
+            return
+        with self.write_transaction() as conn:
+            # Another process may have upgraded the file while we waited
+            if self._schema_version(conn) >= SCHEMA_VERSION:
+                return
+            cursor = conn.cursor()
+            self._create_schema(cursor)
+            # Refresh planner statistics for the new layout; analysis_limit
+            # samples each index so this stays quick on large files
+            cursor.execute("PRAGMA analysis_limit = 400")
+            cursor.execute("ANALYZE")
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    @staticmethod
+    def _schema_version(conn) -> int:
+        return conn.execute("PRAGMA user_version").fetchone()[0]
 
+    def _create_schema(self, cursor):
+        """Create tables, indexes and triggers and migrate older layouts; idempotent."""
         def ensure_column(table: str, column: str, definition: str):
             try:
                 cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
@@ -109,6 +487,7 @@ class Database:
                 mape REAL,
                 train_samples INTEGER,
                 test_samples INTEGER,
+                -- JSON text; a zstd BLOB when written with JSON_COMPRESS=1
                 parameters TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
@@ -139,6 +518,7 @@ class Database:
                 status TEXT NOT NULL,
                 train_start TEXT,
                 train_end TEXT,
+                -- JSON text; zstd BLOBs when written with JSON_COMPRESS=1
                 metrics TEXT,
                 hyperparams TEXT,
                 artifact_path TEXT NOT NULL,
@@ -218,87 +598,244 @@ class Database:
             )
         """)
 
-        conn.commit()
+        # Per-symbol change counters used to invalidate in-process caches
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS data_versions (
+                symbol TEXT NOT NULL,
+                dataset TEXT NOT NULL,
+                version INTEGER NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY(symbol, dataset)
+            )
+        """)
+
+        # Indexes for the hot per-symbol lookups the UNIQUE constraints don't cover
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_forecasts_symbol_created
+            ON forecasts(symbol, created_at DESC)
+        """)
+        # Partial indexes: the evaluation job only ever looks at one side
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_forecasts_pending
+            ON forecasts(created_at) WHERE actual_close IS NULL
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_forecasts_evaluated
+            ON forecasts(symbol, forecast_date DESC) WHERE actual_close IS NOT NULL
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_metrics_history_symbol_created
+            ON metrics_history(symbol, created_at DESC)
+        """)
+        # One metrics row per symbol/model. INSERT OR REPLACE without a key
+        # used to append a row per save; keep only the newest of those.
+        cursor.execute("""
+            DELETE FROM model_metrics
+            WHERE id IN (
+                SELECT id FROM (
+                    SELECT id, ROW_NUMBER() OVER (
+                        PARTITION BY symbol, model_name
+                        ORDER BY updated_at DESC, id DESC
+                    ) AS rank
+                    FROM model_metrics
+                )
+                WHERE rank > 1
+            )
+        """)
+        cursor.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_model_metrics_symbol_model
+            ON model_metrics(symbol, model_name)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_model_metrics_symbol_updated
+            ON model_metrics(symbol, updated_at DESC)
+        """)
+        # Newest-first portfolio reads; positions are covered by UNIQUE(portfolio_id, symbol)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_portfolio_equity_time
+            ON portfolio_equity(portfolio_id, snapshot_time DESC)
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_portfolio_trades_time
+            ON portfolio_trades(portfolio_id, created_at DESC)
+        """)
+        # At most one active version per symbol/model, enforced by SQLite.
+        # Databases written before the constraint keep their newest active row.
+        cursor.execute("DROP INDEX IF EXISTS idx_model_versions_active")
+        cursor.execute("""
+            UPDATE model_versions SET is_active = 0
+            WHERE rowid IN (
+                SELECT rowid FROM (
+                    SELECT rowid, ROW_NUMBER() OVER (
+                        PARTITION BY symbol, model_name
+                        ORDER BY updated_at DESC, rowid DESC
+                    ) AS rank
+                    FROM model_versions
+                    WHERE is_active = 1
+                )
+                WHERE rank > 1
+            )
+        """)
+        cursor.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_model_versions_one_active
+            ON model_versions(symbol, model_name) WHERE is_active = 1
+        """)
+
+        # Distinct symbols, so listing them doesn't walk every historical row.
+        # insert_historical_data adds a batch's symbol once rather than a
+        # per-row trigger doing it for every row; deletes are rare, so a
+        # trigger drops symbols whose last row goes.
+        cursor.execute("""
+            SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'symbols'
+        """)
+        backfill = cursor.fetchone() is None
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS symbols (
+                symbol TEXT PRIMARY KEY
+            ) WITHOUT ROWID
+        """)
+        cursor.execute("DROP TRIGGER IF EXISTS trg_symbols_insert")
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS trg_symbols_delete
+            AFTER DELETE ON historical_prices
+            WHEN NOT EXISTS (SELECT 1 FROM historical_prices WHERE symbol = OLD.symbol)
+            BEGIN
+                DELETE FROM symbols WHERE symbol = OLD.symbol;
+            END
+        """)
+        if backfill:
+            cursor.execute("""
+                INSERT OR IGNORE INTO symbols (symbol)
+                SELECT DISTINCT symbol FROM historical_prices
+            """)
+
+    def _bump_data_version(self, cursor, symbol: str, dataset: str):
+        """Increment the change counter for a symbol's dataset."""
+        cursor.execute("""
+            INSERT INTO data_versions (symbol, dataset, version)
+            VALUES (?, ?, 1)
+            ON CONFLICT(symbol, dataset) DO UPDATE SET
+                version = version + 1,
+                updated_at = CURRENT_TIMESTAMP
+        """, (symbol, dataset))
+
+    def get_data_version(self, symbol: str, dataset: str = "historical") -> int:
+        """Return the change counter for a symbol's dataset (0 if never written)."""
+        conn = self.get_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT version FROM data_versions WHERE symbol = ? AND dataset = ?
+        """, (symbol, dataset))
+        row = cursor.fetchone()
         conn.close()
+        return row[0] if row else 0
     
     def insert_historical_data(self, symbol: str, data: List[Dict[str, Any]]):
-        """Insert historical price data."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        for row in data:
-            try:
-                cursor.execute("""
-                    INSERT OR REPLACE INTO historical_prices 
+        """
+        Insert historical price data in a single transaction.
+
+        Derived features a row leaves out are computed from the batch's
+        closes, so the batch should hold a contiguous date range.
+        """
+        # Validate the whole batch up front; the NOT NULL columns are the
+        # only constraints, so the executemany below cannot fail per row
+        rows = [row for row in data if all(row.get(field) is not None for field in HISTORICAL_REQUIRED)]
+        if len(rows) < len(data):
+            print(f"Skipping {len(data) - len(rows)} historical rows for {symbol}: missing required fields")
+        if not rows:
+            return
+
+        params = [
+            (symbol, row['date'], row['open'], row['high'], row['low'], row['close'],
+             row.get('volume', 0), row.get('return_1d'), row.get('vol_5d'),
+             row.get('sma_5'), row.get('sma_20'))
+            for row in fill_historical_features(rows)
+        ]
+
+        try:
+            # All rows share one transaction and one commit. Existing rows
+            # are updated in place, and skipped when nothing changed.
+            with self.write_transaction() as conn:
+                conn.executemany("""
+                    INSERT INTO historical_prices 
                     (symbol, date, open, high, low, close, volume, return_1d, vol_5d, sma_5, sma_20)
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    symbol,
-                    row['date'],
-                    row['open'],
-                    row['high'],
-                    row['low'],
-                    row['close'],
-                    row.get('volume', 0),
-                    row.get('return_1d'),
-                    row.get('vol_5d'),
-                    row.get('sma_5'),
-                    row.get('sma_20')
-                ))
-            except Exception as e:
-                print(f"Error inserting row: {e}")
-                continue
-        
-        conn.commit()
-        conn.close()
+                    ON CONFLICT(symbol, date) DO UPDATE SET
+                        open = excluded.open, high = excluded.high, low = excluded.low,
+                        close = excluded.close, volume = excluded.volume,
+                        return_1d = excluded.return_1d, vol_5d = excluded.vol_5d,
+                        sma_5 = excluded.sma_5, sma_20 = excluded.sma_20
+                    WHERE (open, high, low, close, volume, return_1d, vol_5d, sma_5, sma_20)
+                        IS NOT (excluded.open, excluded.high, excluded.low, excluded.close,
+                                excluded.volume, excluded.return_1d, excluded.vol_5d,
+                                excluded.sma_5, excluded.sma_20)
+                """, params)
+                conn.execute("INSERT OR IGNORE INTO symbols (symbol) VALUES (?)", (symbol,))
+                self._bump_data_version(conn, symbol, "historical")
+            cached = self._symbols_cache
+            if cached is not None and symbol not in cached[0]:
+                self._symbols_cache = None
+        except Exception as e:
+            print(f"Error inserting historical data for {symbol}: {e}")
     
     def insert_sentiment_data(self, symbol: str, data: List[Dict[str, Any]]):
-        """Insert sentiment data."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        """Insert sentiment data in a single transaction."""
+        params = [
+            (symbol, row['date'], row.get('sent_count', 0), row.get('sent_mean', 0),
+             row.get('sent_median', 0), row.get('sent_std', 0),
+             row.get('sent_pos_share', 0), row.get('sent_neg_share', 0))
+            for row in data if row.get('date') is not None
+        ]
+        if len(params) < len(data):
+            print(f"Skipping {len(data) - len(params)} sentiment rows for {symbol}: missing date")
+        if not params:
+            return
         
-        for row in data:
-            try:
-                cursor.execute("""
-                    INSERT OR REPLACE INTO sentiment_data 
+        try:
+            with self.write_transaction() as conn:
+                conn.executemany("""
+                    INSERT INTO sentiment_data 
                     (symbol, date, sent_count, sent_mean, sent_median, sent_std, sent_pos_share, sent_neg_share)
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                """, (
-                    symbol,
-                    row['date'],
-                    row.get('sent_count', 0),
-                    row.get('sent_mean', 0),
-                    row.get('sent_median', 0),
-                    row.get('sent_std', 0),
-                    row.get('sent_pos_share', 0),
-                    row.get('sent_neg_share', 0)
-                ))
-            except Exception as e:
-                print(f"Error inserting sentiment row: {e}")
-                continue
-        
-        conn.commit()
-        conn.close()
+                    ON CONFLICT(symbol, date) DO UPDATE SET
+                        sent_count = excluded.sent_count, sent_mean = excluded.sent_mean,
+                        sent_median = excluded.sent_median, sent_std = excluded.sent_std,
+                        sent_pos_share = excluded.sent_pos_share, sent_neg_share = excluded.sent_neg_share
+                    WHERE (sent_count, sent_mean, sent_median, sent_std, sent_pos_share, sent_neg_share)
+                        IS NOT (excluded.sent_count, excluded.sent_mean, excluded.sent_median,
+                                excluded.sent_std, excluded.sent_pos_share, excluded.sent_neg_share)
+                """, params)
+        except Exception as e:
+            print(f"Error inserting sentiment data for {symbol}: {e}")
     
-    def get_historical_data(self, symbol: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
-        """Retrieve historical price data for a symbol."""
+    def get_historical_data(self, symbol: str, limit: Optional[int] = None,
+                            fields: Optional[Tuple[str, ...]] = None) -> List[Dict[str, Any]]:
+        """
+        Retrieve historical price data for a symbol.
+
+        ``fields`` narrows each row to those columns (e.g. ``('date', 'close')``
+        for charts); by default every column is returned.
+        """
+        if fields is not None:
+            check_historical_fields(fields)
         conn = self.get_connection()
         cursor = conn.cursor()
         
-        query = """
-            SELECT date, open, high, low, close, volume, return_1d, vol_5d, sma_5, sma_20
+        # Bound, not formatted, so every limit shares one cached statement;
+        # a negative LIMIT means no limit
+        columns = ', '.join(fields or HISTORICAL_FIELDS)
+        cursor.execute(f"""
+            SELECT {columns}
             FROM historical_prices
             WHERE symbol = ?
             ORDER BY date ASC
-        """
-        
-        if limit:
-            query += f" LIMIT {limit}"
-        
-        cursor.execute(query, (symbol,))
+            LIMIT ?
+        """, (symbol, int(limit) if limit else -1))
         rows = cursor.fetchall()
         conn.close()
         
+        if fields is not None:
+            return [dict(zip(fields, row)) for row in rows]
         return [
             {
                 'date': row[0],
@@ -315,37 +852,190 @@ class Database:
             for row in rows
         ]
     
+    def get_historical_columns(self, symbol: str,
+                               fields: Tuple[str, ...] = ('date', 'close'),
+                               limit: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """
+        Return a symbol's history in date order as one array per field.
+
+        ``date`` comes back as a string array; every other field as float64
+        with NULLs mapped to NaN. With ``limit``, only the most recent
+        ``limit`` rows are read.
+        """
+        check_historical_fields(fields)
+        conn = self.get_connection()
+        try:
+            if limit:
+                # Walk the (symbol, date) index backwards, then restore date order
+                rows = conn.execute(f"""
+                    SELECT {', '.join(fields)} FROM historical_prices
+                    WHERE symbol = ?
+                    ORDER BY date DESC
+                    LIMIT ?
+                """, (symbol, int(limit))).fetchall()
+                rows.reverse()
+            else:
+                rows = conn.execute(f"""
+                    SELECT {', '.join(fields)} FROM historical_prices
+                    WHERE symbol = ?
+                    ORDER BY date ASC
+                """, (symbol,)).fetchall()
+        finally:
+            conn.close()
+        return {
+            field: historical_column(field, (row[i] for row in rows), len(rows))
+            for i, field in enumerate(fields)
+        }
+    
+    def get_historical_columns_many(self, symbols: List[str],
+                                    fields: Tuple[str, ...] = ('date', 'close'),
+                                    limit: Optional[int] = None) -> Dict[str, Dict[str, np.ndarray]]:
+        """
+        Column arrays for several symbols from a single query, keyed by symbol.
+
+        Same shape per symbol as get_historical_columns; symbols without
+        rows get empty arrays.
+        """
+        check_historical_fields(fields)
+        symbols = list(dict.fromkeys(symbols))
+        grouped: Dict[str, List[Tuple]] = {symbol: [] for symbol in symbols}
+        if not symbols:
+            return {}
+        placeholders = ', '.join('?' * len(symbols))
+        columns = ', '.join(fields)
+        conn = self.get_connection()
+        try:
+            if limit:
+                # Newest ``limit`` rows of each symbol, still returned in date order
+                cursor = conn.execute(f"""
+                    SELECT symbol, {columns} FROM (
+                        SELECT *, ROW_NUMBER() OVER (
+                            PARTITION BY symbol ORDER BY date DESC
+                        ) AS rank
+                        FROM historical_prices
+                        WHERE symbol IN ({placeholders})
+                    )
+                    WHERE rank <= ?
+                    ORDER BY symbol, date
+                """, (*symbols, int(limit)))
+            else:
+                cursor = conn.execute(f"""
+                    SELECT symbol, {columns} FROM historical_prices
+                    WHERE symbol IN ({placeholders})
+                    ORDER BY symbol, date
+                """, symbols)
+            for row in cursor:
+                grouped[row[0]].append(row)
+        finally:
+            conn.close()
+        return {
+            symbol: {
+                field: historical_column(field, (row[i] for row in rows), len(rows))
+                for i, field in enumerate(fields, start=1)
+            }
+            for symbol, rows in grouped.items()
+        }
+
+    def get_historical_df(self, symbol: str, fields: Tuple[str, ...] = HISTORICAL_FIELDS,
+                          limit: Optional[int] = None):
+        """Return a symbol's history as a pandas DataFrame backed by the column arrays."""
+        return historical_frame(self.get_historical_columns(symbol, fields, limit=limit))
+    
+    def export_parquet(self, table: str, path: str) -> int:
+        """
+        Write ``table`` to a zstd-compressed Parquet file; return the row count.
+
+        For bulk analysis outside the app: Parquet readers (pandas, DuckDB,
+        Polars) load only the columns a query uses. Needs pyarrow or
+        fastparquet, imported on demand through pandas.
+        """
+        if table not in PARQUET_TABLES:
+            raise ValueError(f"Unknown table for Parquet export: {table}")
+        import pandas as pd
+        conn = self.get_connection()
+        try:
+            frame = pd.read_sql_query(f"SELECT * FROM {table}", conn)
+        finally:
+            conn.close()
+        frame.to_parquet(path, compression='zstd', index=False)
+        return len(frame)
+
+    def iter_historical_data(self, symbol: str, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        """Yield historical rows for a symbol without building the full list."""
+        conn = self.get_connection()
+        try:
+            cursor = conn.execute("""
+                SELECT date, open, high, low, close, volume, return_1d, vol_5d, sma_5, sma_20
+                FROM historical_prices
+                WHERE symbol = ?
+                ORDER BY date ASC
+            """, (symbol,))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                # Literal dicts build about twice as fast as dict(zip(...))
+                yield from [
+                    {
+                        'date': row[0],
+                        'open': row[1],
+                        'high': row[2],
+                        'low': row[3],
+                        'close': row[4],
+                        'volume': row[5],
+                        'return_1d': row[6],
+                        'vol_5d': row[7],
+                        'sma_5': row[8],
+                        'sma_20': row[9]
+                    }
+                    for row in rows
+                ]
+        finally:
+            conn.close()
+    
     def insert_forecast(self, symbol: str, model_name: str, forecast_date: str, 
                        horizon_hours: int, predictions: Dict[str, float]):
         """Insert forecast data."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
+        self._write_forecasts(symbol, [
+            self._forecast_params(symbol, model_name, forecast_date, horizon_hours, predictions)
+        ])
+    
+    def insert_forecasts_bulk(self, symbol: str, model_name: str, horizon_hours: int,
+                              rows: List[Dict[str, Any]]):
+        """Insert the forecast rows of one request in a single transaction."""
+        if not rows:
+            return
+        self._write_forecasts(symbol, [
+            self._forecast_params(symbol, model_name, row.get('date') or row.get('forecast_date'),
+                                  horizon_hours, row)
+            for row in rows
+        ])
+
+    @staticmethod
+    def _forecast_params(symbol: str, model_name: str, forecast_date: str,
+                         horizon_hours: int, predictions: Dict[str, Any]) -> Tuple:
+        return (
+            symbol,
+            model_name,
+            predictions.get('model_version'),
+            forecast_date,
+            horizon_hours,
+            predictions.get('predicted_open') or predictions.get('open'),
+            predictions.get('predicted_high') or predictions.get('high'),
+            predictions.get('predicted_low') or predictions.get('low'),
+            predictions.get('predicted_close') or predictions.get('close'),
+            predictions.get('confidence_lower'),
+            predictions.get('confidence_upper')
+        )
+
+    def _write_forecasts(self, symbol: str, params: List[Tuple]):
+        """Upsert forecast rows and bump the symbol's forecasts version in one commit."""
         try:
-            cursor.execute("""
-                INSERT OR REPLACE INTO forecasts 
-                (symbol, model_name, model_version, forecast_date, horizon_hours, 
-                 predicted_open, predicted_high, predicted_low, predicted_close,
-                 confidence_lower, confidence_upper)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """, (
-                symbol,
-                model_name,
-                predictions.get('model_version'),
-                forecast_date,
-                horizon_hours,
-                predictions.get('predicted_open') or predictions.get('open'),
-                predictions.get('predicted_high') or predictions.get('high'),
-                predictions.get('predicted_low') or predictions.get('low'),
-                predictions.get('predicted_close') or predictions.get('close'),
-                predictions.get('confidence_lower'),
-                predictions.get('confidence_upper')
-            ))
-            conn.commit()
+            with self.write_transaction() as conn:
+                conn.executemany(self._UPSERT_FORECAST, params)
+                self._bump_data_version(conn, symbol, "forecasts")
         except Exception as e:
-            print(f"Error inserting forecast: {e}")
-        finally:
-            conn.close()
+            print(f"Error inserting forecasts for {symbol}: {e}")
     
     def get_forecasts(self, symbol: str, model_name: Optional[str] = None) -> List[Dict[str, Any]]:
         """Retrieve forecasts for a symbol."""
@@ -392,29 +1082,62 @@ class Database:
     
     def save_model_metrics(self, symbol: str, model_name: str, metrics: Dict[str, Any]):
         """Save or update model performance metrics."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
         try:
-            cursor.execute("""
-                INSERT OR REPLACE INTO model_metrics 
-                (symbol, model_name, rmse, mae, mape, train_samples, test_samples, parameters, updated_at)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-            """, (
+            with self.write_transaction() as conn:
+                cursor = conn.cursor()
+                cursor.execute("""
+                    INSERT INTO model_metrics 
+                    (symbol, model_name, rmse, mae, mape, train_samples, test_samples, parameters, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(symbol, model_name) DO UPDATE SET
+                        rmse = excluded.rmse, mae = excluded.mae, mape = excluded.mape,
+                        train_samples = excluded.train_samples, test_samples = excluded.test_samples,
+                        parameters = excluded.parameters, updated_at = CURRENT_TIMESTAMP
+                """, (
+                    symbol,
+                    model_name,
+                    metrics.get('rmse'),
+                    metrics.get('mae'),
+                    metrics.get('mape'),
+                    metrics.get('train_samples'),
+                    metrics.get('test_samples'),
+                    _json_dumps(metrics.get('parameters') or {})
+                ))
+                self._bump_data_version(cursor, symbol, "metrics")
+        except Exception as e:
+            print(f"Error saving model metrics: {e}")
+    
+    def save_model_metrics_bulk(self, symbol: str, results: List[Dict[str, Any]]):
+        """Save the metrics of several models (keyed by ``model_name``) in one transaction."""
+        if not results:
+            return
+        params = [
+            (
                 symbol,
-                model_name,
+                metrics['model_name'],
                 metrics.get('rmse'),
                 metrics.get('mae'),
                 metrics.get('mape'),
                 metrics.get('train_samples'),
                 metrics.get('test_samples'),
-                json.dumps(metrics.get('parameters', {}))
-            ))
-            conn.commit()
+                _json_dumps(metrics.get('parameters') or {})
+            )
+            for metrics in results
+        ]
+        try:
+            with self.write_transaction() as conn:
+                conn.executemany("""
+                    INSERT INTO model_metrics 
+                    (symbol, model_name, rmse, mae, mape, train_samples, test_samples, parameters, updated_at)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+                    ON CONFLICT(symbol, model_name) DO UPDATE SET
+                        rmse = excluded.rmse, mae = excluded.mae, mape = excluded.mape,
+                        train_samples = excluded.train_samples, test_samples = excluded.test_samples,
+                        parameters = excluded.parameters, updated_at = CURRENT_TIMESTAMP
+                """, params)
+                self._bump_data_version(conn, symbol, "metrics")
         except Exception as e:
             print(f"Error saving model metrics: {e}")
-        finally:
-            conn.close()
     
     def get_model_metrics(self, symbol: str) -> List[Dict[str, Any]]:
         """Retrieve model performance metrics for a symbol."""
@@ -422,7 +1145,8 @@ class Database:
         cursor = conn.cursor()
         
         cursor.execute("""
-            SELECT model_name, rmse, mae, mape, train_samples, test_samples, parameters, updated_at
+            SELECT model_name, rmse, mae, mape, train_samples, test_samples,
+                   parameters AS "parameters [JSON]", updated_at
             FROM model_metrics
             WHERE symbol = ?
             ORDER BY updated_at DESC
@@ -439,25 +1163,30 @@ class Database:
                 'mape': row[3],
                 'train_samples': row[4],
                 'test_samples': row[5],
-                'parameters': json.loads(row[6]) if row[6] else {},
+                'parameters': row[6] or {},
                 'updated_at': row[7]
             }
             for row in rows
         ]
     
     def get_available_symbols(self) -> List[str]:
-        """Get list of available symbols in database."""
+        """Get list of available symbols in database (cached, see SYMBOLS_CACHE_SECONDS)."""
+        cached = self._symbols_cache
+        if cached is not None and cached[1] > time.monotonic():
+            return list(cached[0])
         conn = self.get_connection()
         cursor = conn.cursor()
         
         cursor.execute("""
-            SELECT DISTINCT symbol FROM historical_prices ORDER BY symbol
+            SELECT symbol FROM symbols ORDER BY symbol
         """)
         
         rows = cursor.fetchall()
         conn.close()
         
-        return [row[0] for row in rows]
+        symbols = tuple(row[0] for row in rows)
+        self._symbols_cache = (symbols, time.monotonic() + SYMBOLS_CACHE_SECONDS)
+        return list(symbols)
 
     # ------------------------------------------------------------------
     # New helpers for assignment 3
@@ -465,54 +1194,60 @@ class Database:
 
     def insert_ingestion_event(self, symbol: str, source: str, rows_inserted: int,
                                status: str, message: str):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO ingestion_events (symbol, source, rows_inserted, status, message)
-            VALUES (?, ?, ?, ?, ?)
-        """, (symbol, source, rows_inserted, status, message))
-        conn.commit()
-        conn.close()
+        with self.write_transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO ingestion_events (symbol, source, rows_inserted, status, message)
+                VALUES (?, ?, ?, ?, ?)
+            """, (symbol, source, rows_inserted, status, message))
 
     def insert_model_version(self, symbol: str, model_name: str, version: str,
                              status: str, train_start: str, train_end: str,
                              metrics: Dict[str, Any], hyperparams: Dict[str, Any],
                              artifact_path: str, activate: bool = False):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT OR REPLACE INTO model_versions
-            (symbol, model_name, version, status, train_start, train_end, metrics,
-             hyperparams, artifact_path, is_active, updated_at)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-        """, (
-            symbol,
-            model_name,
-            version,
-            status,
-            train_start,
-            train_end,
-            json.dumps(metrics or {}),
-            json.dumps(hyperparams or {}),
-            artifact_path,
-            1 if activate else 0
-        ))
-        conn.commit()
-        conn.close()
-        if activate:
-            self.set_active_model_version(symbol, model_name, version)
+        with self.write_transaction() as conn:
+            cursor = conn.cursor()
+            # Inserted inactive; activation flips it in the same transaction
+            cursor.execute("""
+                INSERT INTO model_versions
+                (symbol, model_name, version, status, train_start, train_end, metrics,
+                 hyperparams, artifact_path, is_active, updated_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0, CURRENT_TIMESTAMP)
+                ON CONFLICT(symbol, model_name, version) DO UPDATE SET
+                    status = excluded.status, train_start = excluded.train_start,
+                    train_end = excluded.train_end, metrics = excluded.metrics,
+                    hyperparams = excluded.hyperparams, artifact_path = excluded.artifact_path,
+                    is_active = 0, updated_at = CURRENT_TIMESTAMP
+            """, (
+                symbol,
+                model_name,
+                version,
+                status,
+                train_start,
+                train_end,
+                _json_dumps(metrics or {}),
+                _json_dumps(hyperparams or {}),
+                artifact_path
+            ))
+            if activate:
+                self._activate_model_version(cursor, symbol, model_name, version)
 
     def set_active_model_version(self, symbol: str, model_name: str, version: str):
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.write_transaction() as conn:
+            self._activate_model_version(conn.cursor(), symbol, model_name, version)
+
+    def _activate_model_version(self, cursor, symbol: str, model_name: str, version: str):
+        """Make ``version`` the only active one; deactivate first to satisfy the unique index."""
         cursor.execute("""
             UPDATE model_versions
-            SET is_active = CASE WHEN version = ? THEN 1 ELSE 0 END,
-                updated_at = CURRENT_TIMESTAMP
-            WHERE symbol = ? AND model_name = ?
-        """, (version, symbol, model_name))
-        conn.commit()
-        conn.close()
+            SET is_active = 0, updated_at = CURRENT_TIMESTAMP
+            WHERE symbol = ? AND model_name = ? AND is_active = 1 AND version != ?
+        """, (symbol, model_name, version))
+        cursor.execute("""
+            UPDATE model_versions
+            SET is_active = 1, updated_at = CURRENT_TIMESTAMP
+            WHERE symbol = ? AND model_name = ? AND version = ? AND is_active = 0
+        """, (symbol, model_name, version))
 
     def get_model_versions(self, symbol: str, model_name: Optional[str] = None) -> List[Dict[str, Any]]:
         conn = self.get_connection()
@@ -520,7 +1255,8 @@ class Database:
         if model_name:
             cursor.execute("""
                 SELECT symbol, model_name, version, status, train_start, train_end,
-                       metrics, hyperparams, artifact_path, is_active, created_at, updated_at
+                       metrics AS "metrics [JSON]", hyperparams AS "hyperparams [JSON]",
+                       artifact_path, is_active, created_at, updated_at
                 FROM model_versions
                 WHERE symbol = ? AND model_name = ?
                 ORDER BY created_at DESC
@@ -528,7 +1264,8 @@ class Database:
         else:
             cursor.execute("""
                 SELECT symbol, model_name, version, status, train_start, train_end,
-                       metrics, hyperparams, artifact_path, is_active, created_at, updated_at
+                       metrics AS "metrics [JSON]", hyperparams AS "hyperparams [JSON]",
+                       artifact_path, is_active, created_at, updated_at
                 FROM model_versions
                 WHERE symbol = ?
                 ORDER BY created_at DESC
@@ -543,8 +1280,8 @@ class Database:
                 'status': row[3],
                 'train_start': row[4],
                 'train_end': row[5],
-                'metrics': json.loads(row[6]) if row[6] else {},
-                'hyperparams': json.loads(row[7]) if row[7] else {},
+                'metrics': row[6] or {},
+                'hyperparams': row[7] or {},
                 'artifact_path': row[8],
                 'is_active': bool(row[9]),
                 'created_at': row[10],
@@ -558,7 +1295,8 @@ class Database:
         cursor = conn.cursor()
         cursor.execute("""
             SELECT symbol, model_name, version, status, train_start, train_end,
-                   metrics, hyperparams, artifact_path, is_active, created_at, updated_at
+                   metrics AS "metrics [JSON]", hyperparams AS "hyperparams [JSON]",
+                   artifact_path, is_active, created_at, updated_at
             FROM model_versions
             WHERE symbol = ? AND model_name = ? AND is_active = 1
             ORDER BY updated_at DESC
@@ -575,8 +1313,8 @@ class Database:
             'status': row[3],
             'train_start': row[4],
             'train_end': row[5],
-            'metrics': json.loads(row[6]) if row[6] else {},
-            'hyperparams': json.loads(row[7]) if row[7] else {},
+            'metrics': row[6] or {},
+            'hyperparams': row[7] or {},
             'artifact_path': row[8],
             'is_active': bool(row[9]),
             'created_at': row[10],
@@ -586,14 +1324,16 @@ class Database:
     def get_pending_forecasts(self, min_age_minutes: int = 60) -> List[Dict[str, Any]]:
         conn = self.get_connection()
         cursor = conn.cursor()
-        cursor.execute(f"""
+        # created_at is stored as CURRENT_TIMESTAMP text, which compares
+        # correctly against datetime() without wrapping the column
+        cursor.execute("""
             SELECT id, symbol, model_name, model_version, forecast_date, horizon_hours,
                    predicted_open, predicted_high, predicted_low, predicted_close,
                    created_at
             FROM forecasts
             WHERE actual_close IS NULL
-              AND datetime(created_at) <= datetime('now', '-{min_age_minutes} minutes')
-        """)
+              AND created_at <= datetime('now', ?)
+        """, (f"-{int(min_age_minutes)} minutes",))
         rows = cursor.fetchall()
         conn.close()
         return [
@@ -615,26 +1355,60 @@ class Database:
 
     def update_forecast_evaluation(self, forecast_id: int, actual_close: float,
                                    error_abs: float, error_pct: float):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            UPDATE forecasts
-            SET actual_close = ?, error_abs = ?, error_pct = ?, evaluated_at = CURRENT_TIMESTAMP
-            WHERE id = ?
-        """, (actual_close, error_abs, error_pct, forecast_id))
-        conn.commit()
-        conn.close()
+        with self.write_transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                UPDATE forecasts
+                SET actual_close = ?, error_abs = ?, error_pct = ?, evaluated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+                RETURNING symbol
+            """, (actual_close, error_abs, error_pct, forecast_id))
+            row = cursor.fetchone()
+            if row:
+                self._bump_data_version(cursor, row[0], "forecasts")
+
+    def update_forecast_evaluations(self, evaluations: List[Dict[str, Any]]):
+        """
+        Record actuals for many forecasts in one transaction.
+
+        Each item carries ``forecast_id``, ``symbol``, ``actual_close``,
+        ``error_abs`` and ``error_pct``.
+        """
+        if not evaluations:
+            return
+        with self.write_transaction() as conn:
+            conn.executemany("""
+                UPDATE forecasts
+                SET actual_close = ?, error_abs = ?, error_pct = ?, evaluated_at = CURRENT_TIMESTAMP
+                WHERE id = ?
+            """, [
+                (item['actual_close'], item['error_abs'], item['error_pct'], item['forecast_id'])
+                for item in evaluations
+            ])
+            for symbol in {item['symbol'] for item in evaluations}:
+                self._bump_data_version(conn, symbol, "forecasts")
 
     def insert_metrics_history(self, symbol: str, model_name: str, horizon_hours: int,
                                rmse: float, mae: float, mape: float):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO metrics_history (symbol, model_name, horizon_hours, rmse, mae, mape)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (symbol, model_name, horizon_hours, rmse, mae, mape))
-        conn.commit()
-        conn.close()
+        with self.write_transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO metrics_history (symbol, model_name, horizon_hours, rmse, mae, mape)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, (symbol, model_name, horizon_hours, rmse, mae, mape))
+
+    def insert_metrics_history_many(self, rows: List[Dict[str, Any]]):
+        """Insert several metrics_history rows (keyed like insert_metrics_history) in one transaction."""
+        if not rows:
+            return
+        with self.write_transaction() as conn:
+            conn.executemany("""
+                INSERT INTO metrics_history (symbol, model_name, horizon_hours, rmse, mae, mape)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [
+                (row['symbol'], row['model_name'], row['horizon_hours'], row['rmse'], row['mae'], row['mape'])
+                for row in rows
+            ])
 
     def get_metrics_history(self, symbol: str, limit_days: int = 30) -> List[Dict[str, Any]]:
         conn = self.get_connection()
@@ -642,7 +1416,7 @@ class Database:
         cursor.execute("""
             SELECT symbol, model_name, horizon_hours, rmse, mae, mape, created_at
             FROM metrics_history
-            WHERE symbol = ? AND datetime(created_at) >= datetime('now', ?)
+            WHERE symbol = ? AND created_at >= datetime('now', ?)
             ORDER BY created_at DESC
         """, (symbol, f"-{limit_days} days"))
         rows = cursor.fetchall()
@@ -660,6 +1434,17 @@ class Database:
             for row in rows
         ]
 
+    def get_metrics_summary(self, symbol: str, limit_days: int = 30) -> Dict[str, Any]:
+        """Aggregate a symbol's recent metrics_history in SQL, without materializing rows."""
+        conn = self.get_connection()
+        row = conn.execute("""
+            SELECT COUNT(*), AVG(rmse * rmse), AVG(mae), AVG(mape)
+            FROM metrics_history
+            WHERE symbol = ? AND created_at >= datetime('now', ?)
+        """, (symbol, f"-{limit_days} days")).fetchone()
+        conn.close()
+        return {'count': row[0], 'mean_sq_rmse': row[1], 'mae': row[2], 'mape': row[3]}
+
     def get_forecast_errors(self, symbol: str, model_name: Optional[str] = None,
                             limit: int = 100) -> List[Dict[str, Any]]:
         conn = self.get_connection()
@@ -774,35 +1559,24 @@ class Database:
     def ensure_portfolio(self, name: str, strategy: str, initial_cash: float) -> Dict[str, Any]:
         conn = self.get_connection()
         cursor = conn.cursor()
+        # Fast path: the portfolio almost always exists, so try a plain read first
         cursor.execute("""
             SELECT id, name, cash, initial_cash, strategy, created_at, updated_at
             FROM portfolios
             WHERE name = ?
         """, (name,))
         row = cursor.fetchone()
-        if row:
-            conn.close()
-            return {
-                'id': row[0],
-                'name': row[1],
-                'cash': row[2],
-                'initial_cash': row[3],
-                'strategy': row[4],
-                'created_at': row[5],
-                'updated_at': row[6]
-            }
-        cursor.execute("""
-            INSERT INTO portfolios (name, description, strategy, cash, initial_cash)
-            VALUES (?, ?, ?, ?, ?)
-        """, (name, f"{name} auto-managed portfolio", strategy, initial_cash, initial_cash))
-        conn.commit()
-        portfolio_id = cursor.lastrowid
-        cursor.execute("""
-            SELECT id, name, cash, initial_cash, strategy, created_at, updated_at
-            FROM portfolios WHERE id = ?
-        """, (portfolio_id,))
-        row = cursor.fetchone()
         conn.close()
+        if not row:
+            # Create it in one statement; if another writer got there first the
+            # no-op update still returns the existing row
+            with self.write_transaction() as conn:
+                row = conn.execute("""
+                    INSERT INTO portfolios (name, description, strategy, cash, initial_cash)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(name) DO UPDATE SET name = excluded.name
+                    RETURNING id, name, cash, initial_cash, strategy, created_at, updated_at
+                """, (name, f"{name} auto-managed portfolio", strategy, initial_cash, initial_cash)).fetchone()
         return {
             'id': row[0],
             'name': row[1],
@@ -814,15 +1588,16 @@ class Database:
         }
 
     def update_portfolio_cash(self, portfolio_id: int, cash: float):
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.write_transaction() as conn:
+            self._write_cash(conn.cursor(), portfolio_id, cash)
+
+    @staticmethod
+    def _write_cash(cursor, portfolio_id: int, cash: float):
         cursor.execute("""
             UPDATE portfolios
             SET cash = ?, updated_at = CURRENT_TIMESTAMP
             WHERE id = ?
         """, (cash, portfolio_id))
-        conn.commit()
-        conn.close()
 
     def get_portfolio_positions(self, portfolio_id: int) -> List[Dict[str, Any]]:
         conn = self.get_connection()
@@ -840,8 +1615,11 @@ class Database:
         ]
 
     def upsert_position(self, portfolio_id: int, symbol: str, quantity: float, avg_price: float):
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self.write_transaction() as conn:
+            self._write_position(conn.cursor(), portfolio_id, symbol, quantity, avg_price)
+
+    @staticmethod
+    def _write_position(cursor, portfolio_id: int, symbol: str, quantity: float, avg_price: float):
         if quantity <= 0:
             cursor.execute("""
                 DELETE FROM portfolio_positions
@@ -856,34 +1634,117 @@ class Database:
                     avg_price = excluded.avg_price,
                     updated_at = CURRENT_TIMESTAMP
             """, (portfolio_id, symbol, quantity, avg_price))
-        conn.commit()
-        conn.close()
+
+    def commit_trade(self, portfolio_id: int, symbol: str, action: str,
+                     quantity: float, price: float, reason: str,
+                     cash: float, position_quantity: float, position_avg_price: float):
+        """
+        Apply a trade in one transaction: the trade row, the portfolio's new
+        cash and the symbol's resulting position (removed when quantity <= 0).
+        """
+        with self.write_transaction() as conn:
+            cursor = conn.cursor()
+            cursor.execute(self._INSERT_TRADE,
+                           (portfolio_id, symbol, action, quantity, price, reason, _utc_timestamp()))
+            self._write_cash(cursor, portfolio_id, cash)
+            self._write_position(cursor, portfolio_id, symbol, position_quantity, position_avg_price)
 
     def record_trade(self, portfolio_id: int, symbol: str, action: str,
                      quantity: float, price: float, reason: str):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO portfolio_trades (portfolio_id, symbol, action, quantity, price, reason)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """, (portfolio_id, symbol, action, quantity, price, reason))
-        conn.commit()
-        conn.close()
+        """Write a trade row; unlike equity snapshots it is committed before returning."""
+        self._check_portfolio(portfolio_id)
+        with self.write_transaction() as conn:
+            conn.execute(self._INSERT_TRADE, (portfolio_id, symbol, action, quantity, price,
+                                              reason, _utc_timestamp()))
 
     def record_equity_snapshot(self, portfolio_id: int, equity: float,
                                cash: float, holdings_value: float,
                                returns: float, volatility: float, sharpe: float):
+        """
+        Buffer an equity snapshot for the flusher thread.
+
+        Snapshots are derived from trades and cash that are already stored,
+        so one lost in a crash before the flush can be recomputed.
+        """
+        self._check_portfolio(portfolio_id)
+        self._buffer_row('equity', (portfolio_id, equity, cash, holdings_value, returns,
+                                    volatility, sharpe, _utc_timestamp()))
+
+    def _check_portfolio(self, portfolio_id: int):
+        """
+        Reject rows for a portfolio that does not exist.
+
+        Buffered rows are written later, so the foreign key would otherwise
+        only fail in the flush, away from the caller that caused it.
+        """
         conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            INSERT INTO portfolio_equity
-            (portfolio_id, equity, cash, holdings_value, returns, volatility, sharpe)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        """, (portfolio_id, equity, cash, holdings_value, returns, volatility, sharpe))
-        conn.commit()
+        found = conn.execute("SELECT 1 FROM portfolios WHERE id = ?", (portfolio_id,)).fetchone()
         conn.close()
+        if found is None:
+            raise ValueError(f"Unknown portfolio id: {portfolio_id}")
+
+    def _buffer_row(self, name: str, row: Tuple):
+        """
+        Queue an append-only row for the flusher thread.
+
+        The caller returns without waiting on a commit; a full buffer wakes
+        the flusher early.
+        """
+        with self._buffer_lock:
+            self._buffers[name].append(row)
+            pending = sum(len(rows) for rows in self._buffers.values())
+            if self._flusher is None:
+                self._flusher = threading.Thread(
+                    target=_flush_loop, args=(weakref.ref(self), self._flush_wanted),
+                    name='db-flusher', daemon=True)
+                self._flusher.start()
+        if pending >= WRITE_BUFFER_MAX_ROWS:
+            self.flush()
+        elif pending >= WRITE_BUFFER_ROWS:
+            self._flush_wanted.set()
+
+    def flush(self):
+        """
+        Write buffered equity snapshots in one transaction.
+
+        Readers of those tables call this first, so buffering never hides
+        a row from them. If the batch violates a constraint it is retried
+        row by row and only the offending rows are dropped; on any other
+        failure the rows are kept for the next flush.
+        """
+        with self._flush_lock:
+            with self._buffer_lock:
+                pending = {name: rows for name, rows in self._buffers.items() if rows}
+                self._buffers = {name: [] for name in self._BUFFERED_INSERTS}
+            if not pending:
+                return
+            try:
+                try:
+                    with self.write_transaction() as conn:
+                        for name, rows in pending.items():
+                            conn.executemany(self._BUFFERED_INSERTS[name], rows)
+                except sqlite3.IntegrityError:
+                    self._write_rows_individually(pending)
+            except Exception:
+                with self._buffer_lock:
+                    for name, rows in pending.items():
+                        self._buffers[name][:0] = rows
+                raise
+
+    def _write_rows_individually(self, pending: Dict[str, List[Tuple]]):
+        """Write buffered rows one statement each, dropping those a constraint rejects."""
+        with self.write_transaction() as conn:
+            for name, rows in pending.items():
+                statement = self._BUFFERED_INSERTS[name]
+                for row in rows:
+                    try:
+                        conn.execute(statement, row)
+                    except sqlite3.IntegrityError as e:
+                        # A failed statement leaves the rest of the transaction intact
+                        print(f"Dropping buffered {name} row {row}: {e}")
 
     def get_portfolio_equity_history(self, portfolio_id: int, limit: int = 100) -> List[Dict[str, Any]]:
+        self.flush()
         conn = self.get_connection()
         cursor = conn.cursor()
         cursor.execute("""
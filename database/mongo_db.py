@@ -4,51 +4,154 @@ MongoDB backend implementing the same interface as SQLite Database.
 
 import os
 import json
-from typing import List, Optional, Dict, Any
+import importlib.util
+from typing import List, Optional, Dict, Any, Iterator, Tuple
 from datetime import datetime
-from pymongo import MongoClient, ASCENDING
+import numpy as np
+from pymongo import MongoClient, ASCENDING, DESCENDING, UpdateOne
+
+from database.models import (HISTORICAL_FIELDS, HISTORICAL_REQUIRED, check_historical_fields,
+                             fill_historical_features, historical_column, historical_frame)
+
+
+def _client_options() -> Dict[str, Any]:
+    """Connection-pool settings shared by every MongoClient this backend opens."""
+    options = {
+        'maxPoolSize': int(os.environ.get('MONGO_MAX_POOL', '50')),
+        'minPoolSize': int(os.environ.get('MONGO_MIN_POOL', '5')),
+        'serverSelectionTimeoutMS': int(os.environ.get('MONGO_SELECT_TIMEOUT_MS', '2000')),
+    }
+    # Wire compression is negotiated with the server; zstd needs the zstandard package
+    if importlib.util.find_spec('zstandard') is not None:
+        options['compressors'] = 'zstd'
+    return options
 
 
 class MongoDatabase:
     def __init__(self, mongo_uri: str):
-        self.client = MongoClient(mongo_uri)
-        db_name = os.environ.get('MONGO_DB', 'fintech_forecasting')
-        self.db = self.client[db_name]
+        self.mongo_uri = mongo_uri
+        self.db_name = os.environ.get('MONGO_DB', 'fintech_forecasting')
+        self.client = MongoClient(mongo_uri, **_client_options())
+        self.db = self.client[self.db_name]
         self._ensure_indexes()
 
+    def reconnect(self):
+        """
+        Open a fresh client, e.g. in a forked worker process.
+
+        MongoClient is not fork-safe: a child must not reuse the sockets or
+        monitor threads inherited from its parent.
+        """
+        self.client = MongoClient(self.mongo_uri, **_client_options())
+        self.db = self.client[self.db_name]
+
+    def close(self):
+        """Close the client's connection pool."""
+        self.client.close()
+
     def _ensure_indexes(self):
         self.db.historical_prices.create_index([('symbol', ASCENDING), ('date', ASCENDING)], unique=True)
         self.db.sentiment_data.create_index([('symbol', ASCENDING), ('date', ASCENDING)], unique=True)
         self.db.forecasts.create_index([('symbol', ASCENDING), ('model_name', ASCENDING), ('forecast_date', ASCENDING), ('horizon_hours', ASCENDING)], unique=True)
         self.db.model_metrics.create_index([('symbol', ASCENDING), ('model_name', ASCENDING)])
+        self.db.data_versions.create_index([('symbol', ASCENDING), ('dataset', ASCENDING)], unique=True)
+
+    def _bump_data_version(self, symbol: str, dataset: str):
+        self.db.data_versions.update_one(
+            {'symbol': symbol, 'dataset': dataset},
+            {'$inc': {'version': 1}},
+            upsert=True
+        )
+
+    def get_data_version(self, symbol: str, dataset: str = 'historical') -> int:
+        doc = self.db.data_versions.find_one({'symbol': symbol, 'dataset': dataset}, {'_id': 0, 'version': 1})
+        return doc['version'] if doc else 0
 
     def insert_historical_data(self, symbol: str, data: List[Dict[str, Any]]):
-        for row in data:
-            doc = {**row, 'symbol': symbol}
-            self.db.historical_prices.update_one(
-                {'symbol': symbol, 'date': row['date']},
-                {'$set': doc},
-                upsert=True
-            )
+        rows = [row for row in data if all(row.get(field) is not None for field in HISTORICAL_REQUIRED)]
+        if not rows:
+            return
+        ops = [
+            UpdateOne({'symbol': symbol, 'date': row['date']}, {'$set': {**row, 'symbol': symbol}}, upsert=True)
+            for row in fill_historical_features(rows)
+        ]
+        self.db.historical_prices.bulk_write(ops, ordered=False)
+        self._bump_data_version(symbol, 'historical')
 
     def insert_sentiment_data(self, symbol: str, data: List[Dict[str, Any]]):
-        for row in data:
-            doc = {**row, 'symbol': symbol}
-            self.db.sentiment_data.update_one(
-                {'symbol': symbol, 'date': row['date']},
-                {'$set': doc},
-                upsert=True
-            )
+        ops = [
+            UpdateOne({'symbol': symbol, 'date': row['date']}, {'$set': {**row, 'symbol': symbol}}, upsert=True)
+            for row in data
+            if row.get('date') is not None
+        ]
+        if ops:
+            self.db.sentiment_data.bulk_write(ops, ordered=False)
 
-    def get_historical_data(self, symbol: str, limit: Optional[int] = None) -> List[Dict[str, Any]]:
-        cursor = self.db.historical_prices.find({'symbol': symbol}, {'_id': 0}).sort('date', ASCENDING)
+    def get_historical_data(self, symbol: str, limit: Optional[int] = None,
+                            fields: Optional[Tuple[str, ...]] = None) -> List[Dict[str, Any]]:
+        if fields is not None:
+            check_historical_fields(fields)
+        # Project to the requested columns so unused fields never cross the wire;
+        # full rows keep their symbol, as documents did before projecting
+        projection = {'_id': 0, **{field: 1 for field in fields or ('symbol', *HISTORICAL_FIELDS)}}
+        cursor = self.db.historical_prices.find({'symbol': symbol}, projection).sort('date', ASCENDING)
         if limit:
             cursor = cursor.limit(limit)
         return list(cursor)
 
-    def insert_forecast(self, symbol: str, model_name: str, forecast_date: str, 
-                        horizon_hours: int, predictions: Dict[str, float]):
-        doc = {
+    def get_historical_columns(self, symbol: str,
+                               fields: Tuple[str, ...] = ('date', 'close'),
+                               limit: Optional[int] = None) -> Dict[str, np.ndarray]:
+        check_historical_fields(fields)
+        projection = {'_id': 0, **{field: 1 for field in fields}}
+        cursor = self.db.historical_prices.find({'symbol': symbol}, projection)
+        if limit:
+            # Newest rows first so the server stops after ``limit`` documents
+            docs = list(cursor.sort('date', DESCENDING).limit(int(limit)))
+            docs.reverse()
+        else:
+            docs = list(cursor.sort('date', ASCENDING))
+        return {
+            field: historical_column(field, (doc.get(field) for doc in docs), len(docs))
+            for field in fields
+        }
+
+    def get_historical_columns_many(self, symbols: List[str],
+                                    fields: Tuple[str, ...] = ('date', 'close'),
+                                    limit: Optional[int] = None) -> Dict[str, Dict[str, np.ndarray]]:
+        if limit:
+            # A per-symbol limit needs one query per symbol
+            return {symbol: self.get_historical_columns(symbol, fields, limit=limit)
+                    for symbol in dict.fromkeys(symbols)}
+        check_historical_fields(fields)
+        grouped: Dict[str, List[Dict[str, Any]]] = {symbol: [] for symbol in symbols}
+        projection = {'_id': 0, 'symbol': 1, **{field: 1 for field in fields}}
+        cursor = self.db.historical_prices.find({'symbol': {'$in': list(grouped)}}, projection)
+        for doc in cursor.sort([('symbol', ASCENDING), ('date', ASCENDING)]):
+            grouped[doc['symbol']].append(doc)
+        return {
+            symbol: {
+                field: historical_column(field, (doc.get(field) for doc in docs), len(docs))
+                for field in fields
+            }
+            for symbol, docs in grouped.items()
+        }
+
+    def get_historical_df(self, symbol: str, fields: Tuple[str, ...] = HISTORICAL_FIELDS,
+                          limit: Optional[int] = None):
+        return historical_frame(self.get_historical_columns(symbol, fields, limit=limit))
+
+    def iter_historical_data(self, symbol: str, batch_size: int = 500) -> Iterator[Dict[str, Any]]:
+        projection = {'_id': 0, 'symbol': 1, **{field: 1 for field in HISTORICAL_FIELDS}}
+        cursor = self.db.historical_prices.find({'symbol': symbol}, projection).sort('date', ASCENDING)
+        try:
+            yield from cursor.batch_size(batch_size)
+        finally:
+            cursor.close()
+
+    def _forecast_doc(self, symbol: str, model_name: str, forecast_date: str,
+                      horizon_hours: int, predictions: Dict[str, float]) -> Dict[str, Any]:
+        return {
             'symbol': symbol,
             'model_name': model_name,
             'forecast_date': forecast_date,
@@ -61,6 +164,10 @@ class MongoDatabase:
             'confidence_upper': predictions.get('confidence_upper'),
             'created_at': datetime.utcnow().isoformat()
         }
+
+    def insert_forecast(self, symbol: str, model_name: str, forecast_date: str, 
+                        horizon_hours: int, predictions: Dict[str, float]):
+        doc = self._forecast_doc(symbol, model_name, forecast_date, horizon_hours, predictions)
         self.db.forecasts.update_one(
             {
                 'symbol': symbol,
@@ -71,6 +178,30 @@ class MongoDatabase:
             {'$set': doc},
             upsert=True
         )
+        self._bump_data_version(symbol, 'forecasts')
+
+    def insert_forecasts_bulk(self, symbol: str, model_name: str, horizon_hours: int,
+                              rows: List[Dict[str, Any]]):
+        if not rows:
+            return
+        # Upserts rather than insert_many: re-forecasting the same dates must
+        # replace rows under the unique (symbol, model, date, horizon) index
+        ops = []
+        for row in rows:
+            forecast_date = row.get('date') or row.get('forecast_date')
+            doc = self._forecast_doc(symbol, model_name, forecast_date, horizon_hours, row)
+            ops.append(UpdateOne(
+                {
+                    'symbol': symbol,
+                    'model_name': model_name,
+                    'forecast_date': forecast_date,
+                    'horizon_hours': horizon_hours
+                },
+                {'$set': doc},
+                upsert=True
+            ))
+        self.db.forecasts.bulk_write(ops, ordered=False)
+        self._bump_data_version(symbol, 'forecasts')
 
     def get_forecasts(self, symbol: str, model_name: Optional[str] = None) -> List[Dict[str, Any]]:
         filt = {'symbol': symbol}
@@ -79,8 +210,8 @@ class MongoDatabase:
         cursor = self.db.forecasts.find(filt, {'_id': 0}).sort('forecast_date', ASCENDING)
         return list(cursor)
 
-    def save_model_metrics(self, symbol: str, model_name: str, metrics: Dict[str, Any]):
-        doc = {
+    def _metrics_doc(self, symbol: str, model_name: str, metrics: Dict[str, Any]) -> Dict[str, Any]:
+        return {
             'symbol': symbol,
             'model_name': model_name,
             'rmse': metrics.get('rmse'),
@@ -91,17 +222,35 @@ class MongoDatabase:
             'parameters': metrics.get('parameters', {}),
             'updated_at': datetime.utcnow().isoformat()
         }
+
+    def save_model_metrics(self, symbol: str, model_name: str, metrics: Dict[str, Any]):
         self.db.model_metrics.update_one(
             {'symbol': symbol, 'model_name': model_name},
-            {'$set': doc},
+            {'$set': self._metrics_doc(symbol, model_name, metrics)},
             upsert=True
         )
+        self._bump_data_version(symbol, 'metrics')
+
+    def save_model_metrics_bulk(self, symbol: str, results: List[Dict[str, Any]]):
+        if not results:
+            return
+        ops = [
+            UpdateOne(
+                {'symbol': symbol, 'model_name': metrics['model_name']},
+                {'$set': self._metrics_doc(symbol, metrics['model_name'], metrics)},
+                upsert=True
+            )
+            for metrics in results
+        ]
+        self.db.model_metrics.bulk_write(ops, ordered=False)
+        self._bump_data_version(symbol, 'metrics')
 
     def get_model_metrics(self, symbol: str) -> List[Dict[str, Any]]:
         cursor = self.db.model_metrics.find({'symbol': symbol}, {'_id': 0}).sort('updated_at', -1)
         return list(cursor)
 
     def get_available_symbols(self) -> List[str]:
-        return sorted({d['symbol'] for d in self.db.historical_prices.find({}, {'symbol': 1})})
+        # Answered from the (symbol, date) index rather than every document
+        return sorted(self.db.historical_prices.distinct('symbol'))
 
 
@@ -0,0 +1,48 @@
+"""
+Gunicorn settings for serving app.wsgi:application.
+
+Gunicorn reads this file automatically when started from the project root.
+"""
+
+import atexit
+import logging
+import os
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+# Import the app once in the master so workers share its memory
+# copy-on-write and start without re-importing NumPy/statsmodels.
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+
+def pre_fork(server, worker):
+    """Let model warmup finish in the master so every worker inherits it."""
+    app_module = sys.modules.get('app.app')
+    warmup = getattr(app_module, '_warmup_thread', None)
+    if warmup is not None:
+        warmup.join()
+
+
+def post_fork(server, worker):
+    """Give each worker its own database connections when the app was preloaded."""
+    app_module = sys.modules.get('app.app')
+    if app_module is not None:
+        app_module.db.reconnect()
+
+
+def post_worker_init(worker):
+    """
+    Route application logging through a queue drained by a background thread,
+    so request threads never block on writing tracebacks to stderr.
+    """
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(asctime)s [%(process)d] %(levelname)s %(name)s: %(message)s'))
+    listener = QueueListener(log_queue, handler)
+    listener.start()
+    atexit.register(listener.stop)
+
+    root = logging.getLogger()
+    root.addHandler(QueueHandler(log_queue))
+    root.setLevel(os.environ.get('LOG_LEVEL', 'INFO').upper())
@@ -3,33 +3,70 @@ Forecasting models module.
 Contains traditional and neural network models for time series prediction.
 """
 
+import importlib
+import importlib.util
+from functools import lru_cache, partial
+from types import MappingProxyType
+
 from .traditional_models import MovingAverageModel, ARIMAModel, ExponentialSmoothingModel
 
-try:
-    from .neural_models import LSTMModel, GRUModel, KERAS_AVAILABLE
-except ImportError:
-    KERAS_AVAILABLE = False
-    LSTMModel = None
-    GRUModel = None
+# The neural module pulls in TensorFlow, so it is only imported when a
+# neural model is actually built or LSTMModel/GRUModel are accessed
+KERAS_AVAILABLE = importlib.util.find_spec('tensorflow') is not None
+_NEURAL_CLASSES = ('LSTMModel', 'GRUModel')
+
+
+def __getattr__(name):
+    if name in _NEURAL_CLASSES:
+        value = getattr(importlib.import_module('.neural_models', __name__), name) if KERAS_AVAILABLE else None
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _build_neural(class_name, **kwargs):
+    from . import neural_models
+    return getattr(neural_models, class_name)(**kwargs)
 
+
+@lru_cache(maxsize=None)
 def get_traditional_factories():
-    """Return factory map for traditional models."""
-    return {
-        'ma_5': lambda: MovingAverageModel(window=5),
-        'ma_10': lambda: MovingAverageModel(window=10),
-        'arima': lambda: ARIMAModel(order=(5, 1, 0)),
-        'exp_smooth': lambda: ExponentialSmoothingModel(trend='add'),
-    }
+    """Return the (read-only, shared) factory map for traditional models."""
+    return MappingProxyType({
+        'ma_5': partial(MovingAverageModel, window=5),
+        'ma_10': partial(MovingAverageModel, window=10),
+        'arima': partial(ARIMAModel, order=(5, 1, 0)),
+        'exp_smooth': partial(ExponentialSmoothingModel, trend='add'),
+    })
 
 
+@lru_cache(maxsize=None)
 def get_neural_factories():
-    """Return factory map for neural models (only when TensorFlow available)."""
+    """Return the (read-only, shared) factory map for neural models, empty without TensorFlow."""
     if not KERAS_AVAILABLE:
-        return {}
-    return {
-        'lstm': lambda: LSTMModel(lookback=10, units=50),
-        'gru': lambda: GRUModel(lookback=10, units=50),
-    }
+        return MappingProxyType({})
+    return MappingProxyType({
+        'lstm': partial(_build_neural, 'LSTMModel', lookback=10, units=50),
+        'gru': partial(_build_neural, 'GRUModel', lookback=10, units=50),
+    })
+
+
+def evaluate_model(model_key, train, test, model_type='traditional'):
+    """
+    Build the model registered under ``model_key`` and evaluate it.
+
+    Factories are looked up by key so a worker process only receives the
+    key and the data.
+    """
+    if model_type == 'neural':
+        factories = get_neural_factories()
+    else:
+        factories = get_traditional_factories()
+    model = factories[model_key]()
+    metrics = model.evaluate(train, test)
+    metrics['model_name'] = getattr(model, 'name', model_key)
+    metrics['model_type'] = model_type
+    return metrics
 
 
 __all__ = [
@@ -41,5 +78,6 @@ __all__ = [
     'KERAS_AVAILABLE',
     'get_traditional_factories',
     'get_neural_factories',
+    'evaluate_model',
 ]
 
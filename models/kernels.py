@@ -0,0 +1,132 @@
+"""
+Numeric kernels shared by the forecasting models.
+
+When Numba is installed the loops below are JIT-compiled on first use
+(and cached on disk); otherwise equivalent NumPy implementations are used.
+Numba is imported lazily so importing the models stays cheap.
+"""
+
+import importlib.util
+import threading
+from typing import Tuple
+
+import numpy as np
+
+NUMBA_AVAILABLE = importlib.util.find_spec('numba') is not None
+
+_impl = None
+_impl_lock = threading.Lock()
+
+
+def _forecast_metrics_loop(actual, predicted):
+    """Single pass over the errors accumulating squared, absolute and relative error."""
+    n = actual.shape[0]
+    sq_sum = 0.0
+    abs_sum = 0.0
+    pct_sum = 0.0
+    for i in range(n):
+        err = actual[i] - predicted[i]
+        sq_sum += err * err
+        abs_sum += abs(err)
+        pct_sum += abs(err / actual[i])
+    return np.sqrt(sq_sum / n), abs_sum / n, pct_sum / n * 100.0
+
+
+def _moving_average_loop(history, window, steps):
+    """Recursive moving-average forecast: each prediction feeds the next window."""
+    n = history.shape[0]
+    out = np.empty(steps, dtype=np.float64)
+    if window > 0 and n >= window:
+        # Ring buffer over the last ``window`` values with a running sum:
+        # each step swaps the oldest value for the new prediction, O(1) per step.
+        buf = history[n - window:].copy()
+        total = 0.0
+        for j in range(window):
+            total += buf[j]
+        for step in range(steps):
+            pred = total / window
+            out[step] = pred
+            slot = step % window
+            total += pred - buf[slot]
+            buf[slot] = pred
+        return out
+    # Short history: the window grows with each prediction until it is full
+    buf = np.empty(n + steps, dtype=np.float64)
+    buf[:n] = history
+    for step in range(steps):
+        end = n + step
+        start = end - window if end > window else 0
+        total = 0.0
+        for j in range(start, end):
+            total += buf[j]
+        pred = total / (end - start) if end > start else np.nan
+        out[step] = pred
+        buf[end] = pred
+    return out
+
+
+def _forecast_metrics_numpy(actual, predicted):
+    errors = actual - predicted
+    rmse = np.sqrt(np.mean(errors ** 2))
+    mae = np.mean(np.abs(errors))
+    mape = np.mean(np.abs(errors / actual)) * 100
+    return rmse, mae, mape
+
+
+def _moving_average_numpy(history, window, steps):
+    buf = list(history)
+    out = np.empty(steps, dtype=np.float64)
+    for step in range(steps):
+        pred = np.mean(buf[-window:])
+        out[step] = pred
+        buf.append(pred)
+    return out
+
+
+def _kernels():
+    """Resolve the kernel implementations once, compiling with Numba if present."""
+    global _impl
+    if _impl is None:
+        with _impl_lock:
+            if _impl is None:
+                if NUMBA_AVAILABLE:
+                    from numba import njit
+                    # numpy error model: division by zero yields inf/nan like NumPy
+                    jit = njit(cache=True, error_model='numpy')
+                    _impl = (jit(_forecast_metrics_loop), jit(_moving_average_loop))
+                else:
+                    _impl = (_forecast_metrics_numpy, _moving_average_numpy)
+    return _impl
+
+
+def forecast_metrics(actual, predicted) -> Tuple[float, float, float]:
+    """
+    Compute (RMSE, MAE, MAPE) between actual and predicted values.
+
+    Args:
+        actual: Observed values
+        predicted: Forecast values of the same length
+
+    Returns:
+        Tuple of (rmse, mae, mape) as Python floats
+    """
+    actual = np.ascontiguousarray(actual, dtype=np.float64)
+    predicted = np.ascontiguousarray(predicted, dtype=np.float64)
+    rmse, mae, mape = _kernels()[0](actual, predicted)
+    return float(rmse), float(mae), float(mape)
+
+
+def moving_average_forecast(history, window: int, steps: int) -> np.ndarray:
+    """
+    Forecast ``steps`` values by repeatedly averaging the last ``window`` points.
+
+    Args:
+        history: Historical values
+        window: Number of trailing values to average
+        steps: Number of steps ahead to forecast
+
+    Returns:
+        Array of predictions
+    """
+    history = np.ascontiguousarray(history, dtype=np.float64)
+    return _kernels()[1](history, int(window), int(steps))
@@ -4,9 +4,14 @@ Neural network forecasting models: LSTM, GRU
 
 import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
 from typing import Dict, List, Tuple, Optional
 import warnings
 import os
+import threading
+
+from .kernels import forecast_metrics
+
 warnings.filterwarnings('ignore')
 
 # Try to import TensorFlow/Keras
@@ -23,6 +28,22 @@ except ImportError:
 
 DEFAULT_EPOCHS = max(10, int(os.environ.get('NEURAL_EPOCHS', '30')))
 DEFAULT_PATIENCE = max(3, int(os.environ.get('NEURAL_PATIENCE', '5')))
+TFLITE_INFERENCE = os.environ.get('NEURAL_TFLITE', '1') == '1'
+
+# float16 compute with float32 weights only pays off on GPUs; on CPU the
+# casts cost more than they save. Keras wraps the optimizer in a loss
+# scaler itself when this policy is active.
+MIXED_PRECISION = (KERAS_AVAILABLE
+                   and os.environ.get('NEURAL_MIXED_PRECISION', '1') == '1'
+                   and bool(tf.config.list_physical_devices('GPU')))
+if MIXED_PRECISION:
+    keras.mixed_precision.set_global_policy('mixed_float16')
+
+# Recurrent layer settings that keep Keras on its fused kernels (cuDNN on
+# GPU); changing any of them silently falls back to the generic step loop.
+# Regularize with the Dropout layers between recurrent layers instead.
+FUSED_RECURRENT_ARGS = dict(activation='tanh', recurrent_activation='sigmoid',
+                            recurrent_dropout=0.0, unroll=False, use_bias=True)
 
 
 def create_sequences(data: np.ndarray, lookback: int) -> Tuple[np.ndarray, np.ndarray]:
@@ -36,11 +57,85 @@ def create_sequences(data: np.ndarray, lookback: int) -> Tuple[np.ndarray, np.nd
     Returns:
         Tuple of (X, y) where X is input sequences and y is targets
     """
-    X, y = [], []
-    for i in range(len(data) - lookback):
-        X.append(data[i:i+lookback])
-        y.append(data[i+lookback])
-    return np.array(X), np.array(y)
+    data = np.asarray(data)
+    if len(data) <= lookback:
+        return np.empty((0, lookback), dtype=data.dtype), np.empty(0, dtype=data.dtype)
+    # Each (lookback + 1)-long window is one input sequence plus its target
+    windows = sliding_window_view(data, lookback + 1)
+    return np.ascontiguousarray(windows[:, :-1]), windows[:, -1].copy()
+
+
+def _rollout_function(keras_model, lookback: int):
+    """
+    Graph function running the whole recursive forecast in one call.
+
+    The window stays inside the graph and each prediction is fed back with
+    a tf.while_loop, so a forecast costs one Python-to-TensorFlow dispatch
+    instead of one per step. It is traced once per model and returned as
+    the concrete function, which call sites invoke directly.
+    """
+    @tf.function(input_signature=[tf.TensorSpec([lookback], tf.float32),
+                                  tf.TensorSpec([], tf.int32)])
+    def rollout(window, steps):
+        predictions = tf.TensorArray(tf.float32, size=steps)
+        for i in tf.range(steps):
+            pred = keras_model(tf.reshape(window, [1, lookback, 1]), training=False)[0]
+            predictions = predictions.write(i, pred[0])
+            window = tf.concat([window[1:], pred], axis=0)
+        return predictions.stack()
+
+    return rollout.get_concrete_function()
+
+
+def _recursive_forecast(step, window: np.ndarray, steps: int) -> np.ndarray:
+    """
+    Feed each one-step prediction back into the input window.
+
+    ``step`` maps a (1, lookback, 1) float32 array to the next normalized
+    value; ``window`` is shifted in place, so no array is allocated per step.
+    """
+    lookback = window.shape[0]
+    predictions = np.empty(steps, dtype=np.float64)
+    for i in range(steps):
+        pred = step(window.reshape(1, lookback, 1))
+        predictions[i] = pred
+        window[:-1] = window[1:]
+        window[-1] = pred
+    return predictions
+
+
+class TFLiteRunner:
+    """
+    Single-sample inference through a dynamic-range quantized TFLite copy
+    of a Keras model (INT8 weights, float activations).
+
+    The interpreter is not thread-safe, so invocations are serialized.
+    """
+
+    def __init__(self, keras_model, lookback: int):
+        # Convert with a fixed (1, lookback, 1) input: the recurrent layers
+        # only lower to TFLite builtins when the batch size is static.
+        fn = tf.function(lambda x: keras_model(x, training=False))
+        concrete = fn.get_concrete_function(tf.TensorSpec([1, lookback, 1], tf.float32))
+        converter = tf.lite.TFLiteConverter.from_concrete_functions([concrete], keras_model)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        self.model_content = converter.convert()
+
+        self._interpreter = tf.lite.Interpreter(model_content=self.model_content)
+        self._interpreter.allocate_tensors()
+        self._input_index = self._interpreter.get_input_details()[0]['index']
+        self._output_index = self._interpreter.get_output_details()[0]['index']
+        self._lock = threading.Lock()
+
+    def __call__(self, X: np.ndarray) -> float:
+        with self._lock:
+            # Fused LSTM ops keep their state in variable tensors between
+            # invocations; each window is an independent sample.
+            self._interpreter.reset_all_variables()
+            # Forecast windows are already float32, so this is no copy
+            self._interpreter.set_tensor(self._input_index, np.asarray(X, dtype=np.float32))
+            self._interpreter.invoke()
+            return float(self._interpreter.get_tensor(self._output_index)[0, 0])
 
 
 class LSTMModel:
@@ -68,12 +163,18 @@ class LSTMModel:
         self.max_epochs = DEFAULT_EPOCHS
         self.patience = DEFAULT_PATIENCE
         self.last_history = None
+        self.tflite = None
+        self._rollout_fn = None
     
     def _normalize(self, data: np.ndarray) -> np.ndarray:
         """Normalize data using z-score normalization."""
         self.scaler_mean = np.mean(data)
         self.scaler_std = np.std(data)
-        return (data - self.scaler_mean) / (self.scaler_std + 1e-8)
+        return self._scale(data)
+
+    def _scale(self, data: np.ndarray) -> np.ndarray:
+        """Apply the stored normalization (one multiply per element, no divide)."""
+        return (data - self.scaler_mean) * (1.0 / (self.scaler_std + 1e-8))
     
     def _denormalize(self, data: np.ndarray) -> np.ndarray:
         """Denormalize data."""
@@ -82,17 +183,35 @@ class LSTMModel:
     def build_model(self):
         """Build LSTM architecture."""
         model = Sequential([
-            LSTM(self.units, return_sequences=True, input_shape=(self.lookback, 1)),
+            LSTM(self.units, return_sequences=True, input_shape=(self.lookback, 1),
+                 **FUSED_RECURRENT_ARGS),
             Dropout(self.dropout),
-            LSTM(self.units // 2, return_sequences=False),
+            LSTM(self.units // 2, return_sequences=False, **FUSED_RECURRENT_ARGS),
             Dropout(self.dropout),
             Dense(25, activation='relu'),
-            Dense(1)
+            # Keep the regression output in float32 under mixed precision
+            Dense(1, dtype='float32')
         ])
         
         model.compile(optimizer='adam', loss='mse', metrics=['mae'])
         return model
     
+    def quantize(self) -> bool:
+        """
+        Switch predict() to a quantized TFLite copy of the trained network.
+        
+        Conversion takes a few seconds, so call it once after fit() on models
+        that will serve many forecasts. Disabled with NEURAL_TFLITE=0.
+        
+        Returns:
+            True if the TFLite copy is in use
+        """
+        if self.model is None:
+            raise ValueError("Model must be fitted before quantization")
+        if TFLITE_INFERENCE and getattr(self, 'tflite', None) is None:
+            self.tflite = TFLiteRunner(self.model, self.lookback)
+        return getattr(self, 'tflite', None) is not None
+    
     def fit(self, data: np.ndarray, epochs: Optional[int] = None, batch_size: int = 32, verbose: int = 0):
         """
         Train LSTM model.
@@ -112,14 +231,17 @@ class LSTMModel:
         if self.scaler_mean is None or self.scaler_std is None:
             normalized_data = self._normalize(data)
         else:
-            normalized_data = (data - self.scaler_mean) / (self.scaler_std + 1e-8)
+            normalized_data = self._scale(data)
         
         # Create sequences
-        X, y = create_sequences(normalized_data, self.lookback)
-        X = X.reshape(X.shape[0], X.shape[1], 1)
+        # Keras trains in float32; convert once here rather than per batch
+        X, y = create_sequences(normalized_data.astype(np.float32), self.lookback)
+        X = X[..., np.newaxis]
         
         # Build model
         self.model = self.build_model()
+        self.tflite = None
+        self._rollout_fn = None
         
         # Early stopping
         epochs = epochs if epochs is not None else self.max_epochs
@@ -135,6 +257,19 @@ class LSTMModel:
             callbacks=[early_stop],
             validation_split=0.1
         )
+
+    def __getstate__(self):
+        # Traced graphs and TFLite interpreters don't pickle; both are rebuilt on demand
+        state = self.__dict__.copy()
+        state['_rollout_fn'] = None
+        state['tflite'] = None
+        return state
+
+    def _graph_forecast(self, window: np.ndarray, steps: int) -> np.ndarray:
+        if getattr(self, '_rollout_fn', None) is None:
+            self._rollout_fn = _rollout_function(self.model, self.lookback)
+        predictions = self._rollout_fn(tf.constant(window), tf.constant(steps, dtype=tf.int32))
+        return predictions.numpy().astype(np.float64)
     
     def predict(self, data: np.ndarray, steps: int = 1) -> Tuple[np.ndarray, np.ndarray]:
         """
@@ -156,26 +291,16 @@ class LSTMModel:
             raise ValueError(f"Need at least {self.lookback} observations for prediction")
         
         if self.scaler_mean is None or self.scaler_std is None:
-            normalized_data = self._normalize(data)
+            self._normalize(data)
+        # Only the trailing window feeds the network; scale it straight to float32
+        window = self._scale(data[-self.lookback:]).astype(np.float32)
+        # Models pickled before the TFLite path have no tflite attribute
+        tflite = getattr(self, 'tflite', None)
+        if tflite is not None:
+            normalized = _recursive_forecast(tflite, window, steps)
         else:
-            normalized_data = (data - self.scaler_mean) / (self.scaler_std + 1e-8)
-        
-        predictions = []
-        current_sequence = normalized_data[-self.lookback:].copy()
-        
-        for _ in range(steps):
-            # Reshape for prediction
-            X = current_sequence.reshape(1, self.lookback, 1)
-            
-            # Predict next value
-            pred_normalized = self.model.predict(X, verbose=0)[0, 0]
-            predictions.append(pred_normalized)
-            
-            # Update sequence
-            current_sequence = np.append(current_sequence[1:], pred_normalized)
-        
-        # Denormalize predictions
-        predictions = self._denormalize(np.array(predictions))
+            normalized = self._graph_forecast(window, steps)
+        predictions = self._denormalize(normalized)
         
         # Estimate confidence interval from training volatility
         train_volatility = self.scaler_std
@@ -200,9 +325,7 @@ class LSTMModel:
         context = train[-self.lookback:]
         predictions, _ = self.predict(context, steps=len(test))
         
-        rmse = np.sqrt(np.mean((test - predictions) ** 2))
-        mae = np.mean(np.abs(test - predictions))
-        mape = np.mean(np.abs((test - predictions) / test)) * 100
+        rmse, mae, mape = forecast_metrics(test, predictions)
         
         return {
             'rmse': float(rmse),
@@ -243,12 +366,18 @@ class GRUModel:
         self.max_epochs = DEFAULT_EPOCHS
         self.patience = DEFAULT_PATIENCE
         self.last_history = None
+        self.tflite = None
+        self._rollout_fn = None
     
     def _normalize(self, data: np.ndarray) -> np.ndarray:
         """Normalize data using z-score normalization."""
         self.scaler_mean = np.mean(data)
         self.scaler_std = np.std(data)
-        return (data - self.scaler_mean) / (self.scaler_std + 1e-8)
+        return self._scale(data)
+
+    def _scale(self, data: np.ndarray) -> np.ndarray:
+        """Apply the stored normalization (one multiply per element, no divide)."""
+        return (data - self.scaler_mean) * (1.0 / (self.scaler_std + 1e-8))
     
     def _denormalize(self, data: np.ndarray) -> np.ndarray:
         """Denormalize data."""
@@ -257,17 +386,35 @@ class GRUModel:
     def build_model(self):
         """Build GRU architecture."""
         model = Sequential([
-            GRU(self.units, return_sequences=True, input_shape=(self.lookback, 1)),
+            GRU(self.units, return_sequences=True, input_shape=(self.lookback, 1),
+                reset_after=True, **FUSED_RECURRENT_ARGS),
             Dropout(self.dropout),
-            GRU(self.units // 2, return_sequences=False),
+            GRU(self.units // 2, return_sequences=False, reset_after=True, **FUSED_RECURRENT_ARGS),
             Dropout(self.dropout),
             Dense(25, activation='relu'),
-            Dense(1)
+            # Keep the regression output in float32 under mixed precision
+            Dense(1, dtype='float32')
         ])
         
         model.compile(optimizer='adam', loss='mse', metrics=['mae'])
         return model
     
+    def quantize(self) -> bool:
+        """
+        Switch predict() to a quantized TFLite copy of the trained network.
+        
+        Conversion takes a few seconds, so call it once after fit() on models
+        that will serve many forecasts. Disabled with NEURAL_TFLITE=0.
+        
+        Returns:
+            True if the TFLite copy is in use
+        """
+        if self.model is None:
+            raise ValueError("Model must be fitted before quantization")
+        if TFLITE_INFERENCE and getattr(self, 'tflite', None) is None:
+            self.tflite = TFLiteRunner(self.model, self.lookback)
+        return getattr(self, 'tflite', None) is not None
+    
     def fit(self, data: np.ndarray, epochs: Optional[int] = None, batch_size: int = 32, verbose: int = 0):
         """
         Train GRU model.
@@ -278,15 +425,26 @@ class GRUModel:
             batch_size: Batch size for training
             verbose: Verbosity level
         """
-        # Normalize data
-        normalized_data = self._normalize(data)
+        data = np.asarray(data, dtype=float)
+        
+        if len(data) < self.lookback:
+            raise ValueError(f"Need at least {self.lookback} observations for prediction")
+        
+        # Normalize data using training statistics when available
+        if self.scaler_mean is None or self.scaler_std is None:
+            normalized_data = self._normalize(data)
+        else:
+            normalized_data = self._scale(data)
         
         # Create sequences
-        X, y = create_sequences(normalized_data, self.lookback)
-        X = X.reshape(X.shape[0], X.shape[1], 1)
+        # Keras trains in float32; convert once here rather than per batch
+        X, y = create_sequences(normalized_data.astype(np.float32), self.lookback)
+        X = X[..., np.newaxis]
         
         # Build model
         self.model = self.build_model()
+        self.tflite = None
+        self._rollout_fn = None
         
         # Early stopping
         epochs = epochs if epochs is not None else self.max_epochs
@@ -302,6 +460,19 @@ class GRUModel:
             callbacks=[early_stop],
             validation_split=0.1
         )
+
+    def __getstate__(self):
+        # Traced graphs and TFLite interpreters don't pickle; both are rebuilt on demand
+        state = self.__dict__.copy()
+        state['_rollout_fn'] = None
+        state['tflite'] = None
+        return state
+
+    def _graph_forecast(self, window: np.ndarray, steps: int) -> np.ndarray:
+        if getattr(self, '_rollout_fn', None) is None:
+            self._rollout_fn = _rollout_function(self.model, self.lookback)
+        predictions = self._rollout_fn(tf.constant(window), tf.constant(steps, dtype=tf.int32))
+        return predictions.numpy().astype(np.float64)
     
     def predict(self, data: np.ndarray, steps: int = 1) -> Tuple[np.ndarray, np.ndarray]:
         """
@@ -317,25 +488,23 @@ class GRUModel:
         if self.model is None:
             raise ValueError("Model must be fitted before prediction")
         
-        # Normalize data
-        normalized_data = self._normalize(data)
-        
-        predictions = []
-        current_sequence = normalized_data[-self.lookback:].copy()
+        data = np.asarray(data, dtype=float)
         
-        for _ in range(steps):
-            # Reshape for prediction
-            X = current_sequence.reshape(1, self.lookback, 1)
-            
-            # Predict next value
-            pred_normalized = self.model.predict(X, verbose=0)[0, 0]
-            predictions.append(pred_normalized)
-            
-            # Update sequence
-            current_sequence = np.append(current_sequence[1:], pred_normalized)
+        if len(data) < self.lookback:
+            raise ValueError(f"Need at least {self.lookback} observations for prediction")
         
-        # Denormalize predictions
-        predictions = self._denormalize(np.array(predictions))
+        # Reuse the training statistics; the inference window must not redefine them
+        if self.scaler_mean is None or self.scaler_std is None:
+            self._normalize(data)
+        # Only the trailing window feeds the network; scale it straight to float32
+        window = self._scale(data[-self.lookback:]).astype(np.float32)
+        # Models pickled before the TFLite path have no tflite attribute
+        tflite = getattr(self, 'tflite', None)
+        if tflite is not None:
+            normalized = _recursive_forecast(tflite, window, steps)
+        else:
+            normalized = self._graph_forecast(window, steps)
+        predictions = self._denormalize(normalized)
         
         # Estimate confidence interval from training volatility
         train_volatility = self.scaler_std
@@ -360,9 +529,7 @@ class GRUModel:
         context = train[-self.lookback:]
         predictions, _ = self.predict(context, steps=len(test))
         
-        rmse = np.sqrt(np.mean((test - predictions) ** 2))
-        mae = np.mean(np.abs(test - predictions))
-        mape = np.mean(np.abs((test - predictions) / test)) * 100
+        rmse, mae, mape = forecast_metrics(test, predictions)
         
         return {
             'rmse': float(rmse),
@@ -8,6 +8,9 @@ from typing import Dict, List, Tuple, Optional
 from statsmodels.tsa.arima.model import ARIMA
 from statsmodels.tsa.holtwinters import ExponentialSmoothing
 import warnings
+
+from .kernels import forecast_metrics, moving_average_forecast
+
 warnings.filterwarnings('ignore')
 
 
@@ -22,7 +25,7 @@ class MovingAverageModel:
             window: Number of periods for moving average
         """
         self.window = window
-        self.history = []
+        self.history = np.empty(0, dtype=np.float64)
         self.name = f"MA_{window}"
     
     def fit(self, data: np.ndarray):
@@ -32,7 +35,9 @@ class MovingAverageModel:
         Args:
             data: Array of historical prices
         """
-        self.history = list(data)
+        # Contiguous float64, ready for the JIT kernel; only copies when the
+        # input is not already in that layout. predict() never writes to it.
+        self.history = np.ascontiguousarray(data, dtype=np.float64)
     
     def predict(self, steps: int = 1) -> Tuple[np.ndarray, np.ndarray]:
         """
@@ -44,17 +49,8 @@ class MovingAverageModel:
         Returns:
             Tuple of (predictions, confidence intervals)
         """
-        predictions = []
-        temp_history = self.history.copy()
-        
-        for _ in range(steps):
-            # Use last 'window' values for prediction
-            recent = temp_history[-self.window:]
-            pred = np.mean(recent)
-            predictions.append(pred)
-            temp_history.append(pred)
-        
-        predictions = np.array(predictions)
+        # Each step averages the last 'window' values, including earlier predictions
+        predictions = moving_average_forecast(self.history, self.window, steps)
         
         # Calculate simple confidence intervals based on historical volatility
         volatility = np.std(self.history[-self.window:])
@@ -76,9 +72,7 @@ class MovingAverageModel:
         self.fit(train)
         predictions, _ = self.predict(steps=len(test))
         
-        rmse = np.sqrt(np.mean((test - predictions) ** 2))
-        mae = np.mean(np.abs(test - predictions))
-        mape = np.mean(np.abs((test - predictions) / test)) * 100
+        rmse, mae, mape = forecast_metrics(test, predictions)
         
         return {
             'rmse': float(rmse),
@@ -136,13 +130,12 @@ class ARIMAModel:
         if self.fitted_model is None:
             raise ValueError("Model must be fitted before prediction")
         
-        forecast_result = self.fitted_model.forecast(steps=steps)
-        
-        # Get confidence intervals if available
+        # One state-space forecast gives both the mean and its intervals
+        # (forecast() would just run get_forecast() a second time)
         forecast_obj = self.fitted_model.get_forecast(steps=steps)
         conf_int = forecast_obj.conf_int()
         
-        predictions = np.array(forecast_result)
+        predictions = np.array(forecast_obj.predicted_mean)
         # Calculate width of confidence interval robustly across statsmodels versions
         try:
             if hasattr(conf_int, 'to_numpy'):
@@ -173,9 +166,7 @@ class ARIMAModel:
         self.fit(train)
         predictions, _ = self.predict(steps=len(test))
         
-        rmse = np.sqrt(np.mean((test - predictions) ** 2))
-        mae = np.mean(np.abs(test - predictions))
-        mape = np.mean(np.abs((test - predictions) / test)) * 100
+        rmse, mae, mape = forecast_metrics(test, predictions)
         
         return {
             'rmse': float(rmse),
@@ -262,9 +253,7 @@ class ExponentialSmoothingModel:
         self.fit(train)
         predictions, _ = self.predict(steps=len(test))
         
-        rmse = np.sqrt(np.mean((test - predictions) ** 2))
-        mae = np.mean(np.abs(test - predictions))
-        mape = np.mean(np.abs((test - predictions) / test)) * 100
+        rmse, mae, mape = forecast_metrics(test, predictions)
         
         return {
             'rmse': float(rmse),
@@ -141,7 +141,7 @@ def main():
     # Import and run Flask app
     from app.app import app
     port = int(os.environ.get('PORT', 5000))
-    app.run(debug=True, host='0.0.0.0', port=port)
+    app.run(debug=os.environ.get('FLASK_DEV', '0') == '1', host='0.0.0.0', port=port)
 
 
 if __name__ == "__main__":
@@ -17,6 +17,7 @@ from models import (
     get_traditional_factories,
 )
 
+from .cache_service import LRUCache
 from .config_service import CONFIG
 
 LOGGER = logging.getLogger(__name__)
@@ -27,8 +28,9 @@ class AdaptiveLearningService:
         self.db = db
         self.model_store = Path(CONFIG.model_store_dir)
         self.model_store.mkdir(parents=True, exist_ok=True)
-        self.factories: Dict[str, callable] = get_traditional_factories()
-        self.factories.update(get_neural_factories())
+        self.factories: Dict[str, callable] = {**get_traditional_factories(), **get_neural_factories()}
+        # (symbol, model_name, version) -> unpickled model
+        self._model_cache = LRUCache(maxsize=32)
 
     def _artifact_path(self, symbol: str, model_name: str, version: str) -> Path:
         return self.model_store / symbol / model_name / f"{version}.pkl"
@@ -40,16 +42,26 @@ class AdaptiveLearningService:
         mode: str = "full",
         lookback: Optional[int] = None,
         activate: bool = True,
+        historical: Optional[Dict[str, np.ndarray]] = None,
     ) -> Dict:
+        """
+        Train and register a new model version.
+
+        ``historical`` may carry the ``date``/``close`` columns the caller
+        already fetched for ``symbol``; the database read is skipped when
+        it is supplied.
+        """
         factory = self.factories.get(model_name)
         if factory is None:
             raise ValueError(f"Unsupported model: {model_name}")
 
-        historical = self.db.get_historical_data(symbol)
-        if not historical:
+        if historical is None:
+            historical = self.db.get_historical_columns(symbol, ("date", "close"))
+        dates = historical["date"]
+        if len(dates) == 0:
             raise ValueError(f"No data available for {symbol}")
 
-        prices = np.array([row["close"] for row in historical], dtype=float)
+        prices = historical["close"]
         if lookback and len(prices) > lookback:
             prices = prices[-lookback:]
 
@@ -68,8 +80,8 @@ class AdaptiveLearningService:
         with open(artifact_path, "wb") as fh:
             pickle.dump(trained_model, fh)
 
-        train_start = historical[max(0, len(historical) - len(prices))]["date"]
-        train_end = historical[-1]["date"]
+        train_start = str(dates[max(0, len(dates) - len(prices))])
+        train_end = str(dates[-1])
         hyperparams = {
             "mode": mode,
             "lookback": lookback,
@@ -87,6 +99,8 @@ class AdaptiveLearningService:
             artifact_path=str(artifact_path),
             activate=activate,
         )
+        if activate:
+            self.invalidate_model_cache(symbol, model_name)
 
         LOGGER.info(
             "Trained %s model for %s (version %s)",
@@ -123,14 +137,23 @@ class AdaptiveLearningService:
         version = self.db.get_active_model_version(symbol, model_name)
         if not version:
             return None, None
+        key = (symbol, model_name, version.get("version"))
+        model = self._model_cache.get(key)
+        if model is not None:
+            return model, version
         path = version.get("artifact_path")
         if not path or not os.path.exists(path):
             LOGGER.warning("Artifact missing for %s/%s version %s", symbol, model_name, version.get("version"))
             return None, version
         with open(path, "rb") as fh:
             model = pickle.load(fh)
+        self._model_cache.set(key, model)
         return model, version
 
+    def invalidate_model_cache(self, symbol: str, model_name: str) -> None:
+        """Drop cached models for a symbol/model after its active version changes."""
+        self._model_cache.discard_where(lambda key: key[:2] == (symbol, model_name))
+
     def predict_with_model(self, model, prices: np.ndarray, steps: int):
         if model is None:
             raise ValueError("Model not loaded")
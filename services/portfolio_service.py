@@ -25,25 +25,31 @@ class PortfolioService:
     def _position_map(self, portfolio_id: int) -> Dict[str, Dict]:
         return {pos['symbol']: pos for pos in self.db.get_portfolio_positions(portfolio_id)}
 
-    def _update_position(self, portfolio_id: int, symbol: str, current, quantity: float, price: float):
-        if quantity == 0:
-            return
+    @staticmethod
+    def _next_position(current, symbol: str, quantity: float, price: float):
+        """Update ``current`` for a fill and return the symbol's (quantity, avg_price)."""
         existing = current.get(symbol)
         if not existing:
-            self.db.upsert_position(portfolio_id, symbol, quantity, price)
             current[symbol] = {'symbol': symbol, 'quantity': quantity, 'avg_price': price}
-            return
+            return quantity, price
         total_qty = existing['quantity'] + quantity
         if total_qty <= 0:
-            self.db.upsert_position(portfolio_id, symbol, 0, 0)
             current.pop(symbol, None)
-            return
+            return 0, 0
         if quantity > 0:
             avg_price = (existing['quantity'] * existing['avg_price'] + quantity * price) / total_qty
         else:
             avg_price = existing['avg_price']
-        self.db.upsert_position(portfolio_id, symbol, total_qty, avg_price)
         current[symbol] = {'symbol': symbol, 'quantity': total_qty, 'avg_price': avg_price}
+        return total_qty, avg_price
+
+    def _trade(self, portfolio_id: int, symbol: str, current, action: str,
+               quantity: float, price: float, reason: str, cash: float):
+        """Record a fill, the new cash balance and the resulting position in one commit."""
+        delta = quantity if action == 'buy' else -quantity
+        position_qty, avg_price = self._next_position(current, symbol, delta, price)
+        self.db.commit_trade(portfolio_id, symbol, action, quantity, price, reason,
+                             cash, position_qty, avg_price)
 
     def run_auto_strategy(self) -> Dict:
         portfolio = self._ensure()
@@ -67,19 +73,16 @@ class PortfolioService:
             if delta >= self.buy_threshold and available_cash > spot:
                 quantity = available_cash / spot
                 cash -= quantity * spot
-                self._update_position(portfolio['id'], symbol, positions, quantity, spot)
                 reason = f"Predicted return {delta:.2%} >= {self.buy_threshold:.2%}"
-                self.db.record_trade(portfolio['id'], symbol, 'buy', quantity, spot, reason)
+                self._trade(portfolio['id'], symbol, positions, 'buy', quantity, spot, reason, cash)
                 actions.append({'symbol': symbol, 'action': 'buy', 'quantity': quantity, 'price': spot})
             elif delta <= -self.sell_threshold and position:
-                quantity = -position['quantity']
-                cash += position['quantity'] * spot
-                self._update_position(portfolio['id'], symbol, positions, quantity, spot)
+                quantity = position['quantity']
+                cash += quantity * spot
                 reason = f"Predicted return {delta:.2%} <= -{self.sell_threshold:.2%}"
-                self.db.record_trade(portfolio['id'], symbol, 'sell', -quantity, spot, reason)
-                actions.append({'symbol': symbol, 'action': 'sell', 'quantity': -quantity, 'price': spot})
+                self._trade(portfolio['id'], symbol, positions, 'sell', quantity, spot, reason, cash)
+                actions.append({'symbol': symbol, 'action': 'sell', 'quantity': quantity, 'price': spot})
 
-        self.db.update_portfolio_cash(portfolio['id'], cash)
         metrics = self._snapshot(portfolio['id'])
         metrics['actions'] = actions
         return metrics
@@ -129,17 +132,15 @@ class PortfolioService:
             if cost > portfolio['cash']:
                 raise ValueError('Insufficient cash')
             portfolio['cash'] -= cost
-            self.db.update_portfolio_cash(portfolio['id'], portfolio['cash'])
-            self._update_position(portfolio['id'], symbol, positions, quantity, price)
-            self.db.record_trade(portfolio['id'], symbol, 'buy', quantity, price, 'manual')
+            self._trade(portfolio['id'], symbol, positions, 'buy', quantity, price, 'manual',
+                        portfolio['cash'])
         elif action == 'sell':
             position = positions.get(symbol)
             if not position or position['quantity'] < quantity:
                 raise ValueError('Insufficient holdings')
             portfolio['cash'] += quantity * price
-            self.db.update_portfolio_cash(portfolio['id'], portfolio['cash'])
-            self._update_position(portfolio['id'], symbol, positions, -quantity, price)
-            self.db.record_trade(portfolio['id'], symbol, 'sell', quantity, price, 'manual')
+            self._trade(portfolio['id'], symbol, positions, 'sell', quantity, price, 'manual',
+                        portfolio['cash'])
         else:
             raise ValueError('Unsupported action')
         return self._snapshot(portfolio['id'])
@@ -50,10 +50,13 @@ class PipelineScheduler:
             LOGGER.exception("Ingestion job failed: %s", exc)
 
     def _run_training(self):
-        for symbol in CONFIG.ingest_symbols:
+        # One history read for all symbols, shared by every model
+        histories = self.db.get_historical_columns_many(CONFIG.ingest_symbols, ('date', 'close'))
+        for symbol, historical in histories.items():
             for model_name in self.adaptive.get_available_models():
                 try:
-                    self.adaptive.train(symbol=symbol, model_name=model_name, mode='update', activate=True)
+                    self.adaptive.train(symbol=symbol, model_name=model_name, mode='update',
+                                        activate=True, historical=historical)
                 except Exception as exc:
                     LOGGER.warning("Training skipped for %s/%s: %s", symbol, model_name, exc)
 
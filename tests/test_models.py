@@ -2,11 +2,14 @@
 Unit tests for forecasting models.
 """
 
+import importlib.util
+import sqlite3
 import unittest
 import numpy as np
 import sys
 import os
 import tempfile
+import time
 
 # Add parent directory to path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -57,6 +60,20 @@ class TestMovingAverageModel(unittest.TestCase):
         self.assertTrue(metrics['rmse'] > 0)
         self.assertTrue(metrics['mae'] > 0)
 
+    def test_kernel_matches_numpy_reference(self):
+        """The compiled ring-buffer forecast must match the plain NumPy recursion."""
+        from models import kernels
+        rng = np.random.default_rng(0)
+        history = rng.normal(100, 5, 200)
+        for window, size, steps in ((5, 200, 120), (20, 200, 3), (10, 4, 12), (3, 1, 5)):
+            expected = kernels._moving_average_numpy(history[:size], window, steps)
+            actual = kernels.moving_average_forecast(history[:size], window, steps)
+            np.testing.assert_allclose(actual, expected, rtol=1e-12, equal_nan=True)
+
+        actual, predicted = history[:50], history[50:100]
+        np.testing.assert_allclose(kernels.forecast_metrics(actual, predicted),
+                                   kernels._forecast_metrics_numpy(actual, predicted), rtol=1e-12)
+
 
 class TestARIMAModel(unittest.TestCase):
     """Test cases for ARIMA model."""
@@ -182,6 +199,32 @@ class TestModelComparison(unittest.TestCase):
             print(f"{result['name']:20s} - RMSE: {result['rmse']:.4f}, MAE: {result['mae']:.4f}")
         print("=" * 60)
 
+    def test_evaluate_model_in_worker_process(self):
+        """Registry evaluation must be submittable to a process pool."""
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        from models import evaluate_model
+
+        # The app starts its pool with forkserver/spawn, so the callable
+        # must be importable in a fresh interpreter
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context('spawn')) as pool:
+            metrics = pool.submit(evaluate_model, 'ma_5', self.train, self.test).result()
+
+        expected = MovingAverageModel(window=5).evaluate(self.train, self.test)
+        self.assertEqual(metrics['model_name'], 'MA_5')
+        self.assertEqual(metrics['model_type'], 'traditional')
+        self.assertAlmostEqual(metrics['rmse'], expected['rmse'])
+
+    def test_neural_factories_do_not_import_tensorflow(self):
+        """Listing the neural models must not pay for importing TensorFlow."""
+        import subprocess
+        code = ("import sys, models; models.get_neural_factories(); "
+                "print('tensorflow' in sys.modules)")
+        root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        out = subprocess.run([sys.executable, '-c', code], cwd=root,
+                             capture_output=True, text=True, check=True).stdout
+        self.assertEqual(out.strip(), 'False')
+
 
 class BaseServiceTestCase(unittest.TestCase):
     """Utility base class for database-backed service tests."""
@@ -225,6 +268,268 @@ class TestModelRegistryIntegration(BaseServiceTestCase):
         active = self.db.get_active_model_version("AAPL", "arima")
         self.assertIsNotNone(active)
         self.assertEqual(active["version"], "v2")
+        self.assertEqual(active["metrics"], {"rmse": 0.8})
+        self.assertEqual(active["hyperparams"], {"window": 5})
+
+        self.db.set_active_model_version("AAPL", "arima", "v1")
+        versions = {row["version"]: row["is_active"] for row in self.db.get_model_versions("AAPL", "arima")}
+        self.assertEqual(versions, {"v1": True, "v2": False})
+
+        conn = self.db.get_connection()
+        with self.assertRaises(sqlite3.IntegrityError):
+            conn.execute("UPDATE model_versions SET is_active = 1 WHERE version = 'v2'")
+        conn.close()
+
+    def test_large_hyperparams_round_trip(self):
+        hyperparams = {f"layer_{i}": {"units": 64, "dropout": 0.2} for i in range(100)}
+        self.db.insert_model_version(
+            symbol="AAPL",
+            model_name="lstm",
+            version="v1",
+            status="ready",
+            train_start="2024-01-01",
+            train_end="2024-01-31",
+            metrics={"rmse": 1.0},
+            hyperparams=hyperparams,
+            artifact_path="models_store/AAPL/lstm/v1.keras",
+            activate=True,
+        )
+        active = self.db.get_active_model_version("AAPL", "lstm")
+        self.assertEqual(active["hyperparams"], hyperparams)
+        # Compression is opt-in, so the column holds plain JSON text
+        conn = self.db.get_connection()
+        stored_type = conn.execute("SELECT typeof(hyperparams) FROM model_versions").fetchone()[0]
+        conn.close()
+        self.assertEqual(stored_type, "text")
+
+
+class TestDataVersions(BaseServiceTestCase):
+    def test_historical_writes_bump_version(self):
+        self.assertEqual(self.db.get_data_version("AAPL"), 0)
+        row = {"date": "2024-01-01", "open": 100, "high": 101, "low": 99, "close": 100.5, "volume": 1000}
+        self.db.insert_historical_data("AAPL", [row])
+        self.assertEqual(self.db.get_data_version("AAPL"), 1)
+        self.db.insert_historical_data("AAPL", [{**row, "close": 100.7}])
+        self.assertEqual(self.db.get_data_version("AAPL"), 2)
+        self.assertEqual(self.db.get_data_version("MSFT"), 0)
+
+    def test_forecast_writes_bump_version(self):
+        self.db.insert_forecast("AAPL", "arima", "2024-01-02", 24, {"predicted_close": 101.0})
+        self.db.insert_forecasts_bulk("AAPL", "arima", 24, [{"date": "2024-01-03", "predicted_close": 102.0}])
+        self.assertEqual(self.db.get_data_version("AAPL", "forecasts"), 2)
+        self.assertEqual(self.db.get_data_version("AAPL"), 0)
+
+    def test_metrics_writes_bump_version(self):
+        self.db.save_model_metrics("AAPL", "arima", {"rmse": 1.0})
+        self.db.save_model_metrics_bulk("AAPL", [{"model_name": "ma_5", "rmse": 2.0}])
+        self.assertEqual(self.db.get_data_version("AAPL", "metrics"), 2)
+
+
+class TestHistoricalQueries(BaseServiceTestCase):
+    def test_get_historical_columns(self):
+        self.db.insert_historical_data("AAPL", [
+            {"date": "2024-01-02", "open": 101, "high": 102, "low": 100, "close": 101.5, "volume": 1100},
+            {"date": "2024-01-01", "open": 100, "high": 101, "low": 99, "close": 100.5, "volume": 1000},
+        ])
+        columns = self.db.get_historical_columns("AAPL", ("date", "close", "sma_20"))
+        self.assertEqual(columns["date"].tolist(), ["2024-01-01", "2024-01-02"])
+        np.testing.assert_allclose(columns["close"], [100.5, 101.5])
+        self.assertTrue(np.isnan(columns["sma_20"]).all())
+
+        columns = self.db.get_historical_columns("MSFT")
+        self.assertEqual(columns["date"].shape, (0,))
+        self.assertEqual(columns["close"].shape, (0,))
+
+        with self.assertRaises(ValueError):
+            self.db.get_historical_columns("AAPL", ("close; DROP TABLE historical_prices",))
+
+    def test_get_historical_columns_limit(self):
+        self.db.insert_historical_data("AAPL", [
+            {"date": f"2024-01-0{day}", "open": 100, "high": 101, "low": 99, "close": 100 + day, "volume": 1000}
+            for day in range(1, 6)
+        ])
+        columns = self.db.get_historical_columns("AAPL", limit=2)
+        self.assertEqual(columns["date"].tolist(), ["2024-01-04", "2024-01-05"])
+        np.testing.assert_allclose(columns["close"], [104, 105])
+
+        frame = self.db.get_historical_df("AAPL", ("date", "close"), limit=2)
+        self.assertEqual(list(frame.columns), ["date", "close"])
+        self.assertEqual(str(frame["date"].dtype), "datetime64[ns]")
+        np.testing.assert_allclose(frame["close"].to_numpy(), [104, 105])
+
+    def test_get_historical_data_fields(self):
+        self.db.insert_historical_data("AAPL", [
+            {"date": "2024-01-01", "open": 100, "high": 101, "low": 99, "close": 100.5, "volume": 1000},
+        ])
+        rows = self.db.get_historical_data("AAPL", fields=("date", "close"))
+        self.assertEqual(rows, [{"date": "2024-01-01", "close": 100.5}])
+        self.assertEqual(len(self.db.get_historical_data("AAPL")[0]), 10)
+        with self.assertRaises(ValueError):
+            self.db.get_historical_data("AAPL", fields=("symbol",))
+
+    def test_get_historical_columns_many(self):
+        for symbol, base in (("AAPL", 100), ("MSFT", 200)):
+            self.db.insert_historical_data(symbol, [
+                {"date": f"2024-01-0{day}", "open": base, "high": base + 1, "low": base - 1,
+                 "close": base + day, "volume": 1000}
+                for day in range(1, 4)
+            ])
+        histories = self.db.get_historical_columns_many(["MSFT", "AAPL", "TSLA"])
+        self.assertEqual(list(histories), ["MSFT", "AAPL", "TSLA"])
+        np.testing.assert_allclose(histories["AAPL"]["close"], [101, 102, 103])
+        np.testing.assert_allclose(histories["MSFT"]["close"], [201, 202, 203])
+        self.assertEqual(histories["TSLA"]["close"].shape, (0,))
+
+        histories = self.db.get_historical_columns_many(["AAPL", "MSFT"], ("date", "close"), limit=2)
+        self.assertEqual(histories["AAPL"]["date"].tolist(), ["2024-01-02", "2024-01-03"])
+        np.testing.assert_allclose(histories["MSFT"]["close"], [202, 203])
+
+    def test_insert_historical_data_skips_incomplete_rows(self):
+        self.db.insert_historical_data("AAPL", [
+            {"date": "2024-01-01", "open": 100, "high": 101, "low": 99, "close": 100.5},
+            {"date": "2024-01-02", "open": 101, "high": 102, "low": 100},
+            {"date": "2024-01-03", "open": 102, "high": 103, "low": 101, "close": None},
+        ])
+        columns = self.db.get_historical_columns("AAPL")
+        self.assertEqual(columns["date"].tolist(), ["2024-01-01"])
+        self.assertEqual(self.db.get_data_version("AAPL"), 1)
+
+    def test_insert_historical_data_computes_missing_features(self):
+        import pandas as pd
+        closes = 100 + np.cumsum(np.random.RandomState(0).randn(30))
+        rows = [
+            {"date": f"2024-02-{day + 1:02d}", "open": c, "high": c + 1, "low": c - 1, "close": c}
+            for day, c in enumerate(closes)
+        ]
+        rows[-1]["sma_5"] = 1.0  # supplied values are kept
+        self.db.insert_historical_data("AAPL", rows[::-1])
+
+        columns = self.db.get_historical_columns("AAPL", ("return_1d", "vol_5d", "sma_5", "sma_20"))
+        close = pd.Series(closes)
+        returns = close.pct_change()
+        expected_sma_5 = close.rolling(5).mean().to_numpy()
+        expected_sma_5[-1] = 1.0
+        np.testing.assert_allclose(columns["return_1d"], returns.to_numpy())
+        np.testing.assert_allclose(columns["vol_5d"], returns.rolling(5).std().to_numpy())
+        np.testing.assert_allclose(columns["sma_5"], expected_sma_5)
+        np.testing.assert_allclose(columns["sma_20"], close.rolling(20).mean().to_numpy())
+
+    def test_available_symbols_table(self):
+        row = {"date": "2024-01-01", "open": 100, "high": 101, "low": 99, "close": 100.5}
+        self.db.insert_historical_data("MSFT", [row])
+        self.db.insert_historical_data("AAPL", [row, {**row, "date": "2024-01-02"}])
+        self.assertEqual(self.db.get_available_symbols(), ["AAPL", "MSFT"])
+
+        # Databases created before the table are backfilled once; an
+        # up-to-date user_version skips the schema pass entirely
+        conn = self.db.get_connection()
+        conn.execute("DROP TABLE symbols")
+        conn.commit()
+        self.db.init_schema()
+        self.assertIsNone(conn.execute("SELECT name FROM sqlite_master WHERE name = 'symbols'").fetchone())
+        # Older files also carry a per-row insert trigger, dropped on upgrade
+        conn.execute("""
+            CREATE TRIGGER trg_symbols_insert AFTER INSERT ON historical_prices
+            BEGIN SELECT 1; END
+        """)
+        conn.execute("PRAGMA user_version = 0")
+        self.db.init_schema()
+        self.assertIsNone(conn.execute("SELECT name FROM sqlite_master WHERE name = 'trg_symbols_insert'").fetchone())
+        # Raw SQL bypasses the in-process list cache, so read the table afresh
+        self.db._symbols_cache = None
+        self.assertEqual(self.db.get_available_symbols(), ["AAPL", "MSFT"])
+
+        conn = self.db.get_connection()
+        conn.execute("DELETE FROM historical_prices WHERE symbol = 'MSFT'")
+        conn.commit()
+        self.db._symbols_cache = None
+        self.assertEqual(self.db.get_available_symbols(), ["AAPL"])
+
+    def test_available_symbols_cached_until_new_symbol(self):
+        row = {"date": "2024-01-01", "open": 100, "high": 101, "low": 99, "close": 100.5}
+        self.db.insert_historical_data("MSFT", [row])
+        self.assertEqual(self.db.get_available_symbols(), ["MSFT"])
+
+        # Served from memory: a row written behind the cache's back is not seen
+        conn = self.db.get_connection()
+        conn.execute("INSERT INTO symbols (symbol) VALUES ('TSLA')")
+        conn.commit()
+        self.db.insert_historical_data("MSFT", [{**row, "date": "2024-01-02"}])
+        self.assertEqual(self.db.get_available_symbols(), ["MSFT"])
+
+        # A new symbol through insert_historical_data invalidates it
+        self.db.insert_historical_data("AAPL", [row])
+        self.assertEqual(self.db.get_available_symbols(), ["AAPL", "MSFT", "TSLA"])
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow not installed")
+    def test_export_parquet(self):
+        import pandas as pd
+        self.db.insert_historical_data("AAPL", [
+            {"date": "2024-01-01", "open": 100, "high": 101, "low": 99, "close": 100.5},
+        ])
+        path = os.path.join(self.tempdir.name, "prices.parquet")
+        self.assertEqual(self.db.export_parquet("historical_prices", path), 1)
+        self.assertEqual(pd.read_parquet(path, columns=["close"])["close"].tolist(), [100.5])
+        with self.assertRaises(ValueError):
+            self.db.export_parquet("portfolios", path)
+
+
+class TestForecastStorage(BaseServiceTestCase):
+    def test_insert_forecasts_bulk(self):
+        rows = [
+            {"date": "2024-01-02", "model_version": "v1", "predicted_close": 101.0,
+             "confidence_lower": 99.0, "confidence_upper": 103.0},
+            {"date": "2024-01-03", "model_version": "v1", "predicted_close": 102.0,
+             "confidence_lower": 100.0, "confidence_upper": 104.0},
+        ]
+        self.db.insert_forecasts_bulk("AAPL", "arima", 24, rows)
+        self.db.insert_forecasts_bulk("AAPL", "arima", 24, rows[1:])
+
+        saved = self.db.get_forecasts("AAPL", model_name="arima")
+        self.assertEqual([row["forecast_date"] for row in saved], ["2024-01-02", "2024-01-03"])
+        self.assertEqual(saved[1]["predicted_close"], 102.0)
+
+    def test_save_model_metrics_bulk(self):
+        self.db.save_model_metrics_bulk("AAPL", [
+            {"model_name": "MA_5", "rmse": 1.0, "mae": 0.5, "parameters": {"window": 5}},
+            {"model_name": "ARIMA_5_1_0", "rmse": 2.0, "mae": 1.5},
+        ])
+
+        saved = {row["model_name"]: row for row in self.db.get_model_metrics("AAPL")}
+        self.assertEqual(set(saved), {"MA_5", "ARIMA_5_1_0"})
+        self.assertEqual(saved["MA_5"]["rmse"], 1.0)
+        self.assertEqual(saved["MA_5"]["parameters"], {"window": 5})
+
+        # Re-saving updates the model's row instead of adding another
+        self.db.save_model_metrics("AAPL", "MA_5", {"rmse": 0.9, "mae": 0.4})
+        rows = self.db.get_model_metrics("AAPL")
+        self.assertEqual(len(rows), 2)
+        self.assertEqual([row["rmse"] for row in rows if row["model_name"] == "MA_5"], [0.9])
+
+    def test_write_transaction_rolls_back_on_error(self):
+        with self.assertRaises(RuntimeError):
+            with self.db.write_transaction() as conn:
+                conn.execute("INSERT INTO model_metrics (symbol, model_name, rmse) VALUES ('AAPL', 'MA_5', 1.0)")
+                raise RuntimeError("abort")
+        self.assertEqual(self.db.get_model_metrics("AAPL"), [])
+
+    def test_close_disposes_pooled_connections(self):
+        conn = self.db.get_connection()
+        self.assertIs(self.db.get_connection(), conn)
+        self.db.close()
+        with self.assertRaises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+        self.assertEqual(self.db.get_available_symbols(), [])
+
+    def test_close_does_not_raise_on_unwritable_buffer(self):
+        portfolio = self.db.ensure_portfolio("Stranded", "manual", 1000.0)
+        conn = self.db.get_connection()
+        conn.execute("DROP TABLE portfolio_equity")
+        self.db.record_equity_snapshot(portfolio["id"], 1000.0, 1000.0, 0.0, 0.0, 0.0, 0.0)
+        self.db.close()
+        with self.assertRaises(sqlite3.ProgrammingError):
+            conn.execute("SELECT 1")
+        self.assertEqual(sum(len(rows) for rows in self.db._buffers.values()), 0)
 
 
 class TestEvaluationPipeline(BaseServiceTestCase):
@@ -258,6 +563,53 @@ class TestEvaluationPipeline(BaseServiceTestCase):
         errors = self.db.get_forecast_errors("AAPL", model_name="arima", limit=1)
         self.assertTrue(errors)
         self.assertIsNotNone(errors[0]["actual_close"])
+        self.assertEqual(len(self.db.get_metrics_history("AAPL")), result["completed"])
+        rolling = self.service.rolling_metrics("AAPL")
+        self.assertEqual(rolling["count"], result["completed"])
+        self.assertAlmostEqual(rolling["mae"], errors[0]["error_abs"])
+        self.assertAlmostEqual(rolling["rmse"], errors[0]["error_abs"])
+
+    def test_get_pending_forecasts_respects_age(self):
+        self.db.insert_forecast("AAPL", "arima", "2024-01-01", 24, {"predicted_close": 102.0})
+        self.db.insert_forecast("AAPL", "arima", "2024-01-02", 24, {"predicted_close": 103.0})
+        conn = self.db.get_connection()
+        conn.execute("UPDATE forecasts SET created_at = datetime('now', '-90 minutes') WHERE forecast_date = '2024-01-01'")
+        conn.commit()
+        conn.close()
+
+        pending = self.db.get_pending_forecasts(min_age_minutes=60)
+        self.assertEqual([row["forecast_date"] for row in pending], ["2024-01-01"])
+        self.db.update_forecast_evaluation(pending[0]["id"], 100.5, 1.5, 1.49)
+        self.assertEqual(self.db.get_pending_forecasts(min_age_minutes=60), [])
+        self.assertEqual(self.db.get_data_version("AAPL", "forecasts"), 3)
+
+        # A revised forecast keeps its row but is pending evaluation again
+        self.db.insert_forecast("AAPL", "arima", "2024-01-01", 24, {"predicted_close": 101.0})
+        pending_again = self.db.get_pending_forecasts(min_age_minutes=0)
+        self.assertIn(pending[0]["id"], [row["id"] for row in pending_again])
+
+    def test_hot_lookups_search_indexes(self):
+        # TEXT timestamps compare against a datetime() evaluated once per
+        # query, and the latest-row getters walk an index backwards and stop
+        # at LIMIT 1, so none of these scan or sort
+        conn = self.db.get_connection()
+        statements = []
+        conn.set_trace_callback(statements.append)
+        try:
+            self.db.get_pending_forecasts(min_age_minutes=60)
+            self.db.get_metrics_history("AAPL")
+            self.db.get_latest_price("AAPL")
+            self.db.get_latest_forecast("AAPL")
+            self.db.get_model_metrics("AAPL")
+            self.db.get_recent_trades(1)
+            self.db.get_portfolio_equity_history(1)
+        finally:
+            conn.set_trace_callback(None)
+        self.assertEqual(len(statements), 7)
+        for sql in statements:
+            plan = " ".join(row[3] for row in conn.execute("EXPLAIN QUERY PLAN " + sql))
+            self.assertIn("USING INDEX", plan, sql)
+            self.assertNotIn("TEMP B-TREE", plan, sql)
 
 
 class TestPortfolioServiceIntegration(BaseServiceTestCase):
@@ -275,6 +627,65 @@ class TestPortfolioServiceIntegration(BaseServiceTestCase):
         self.assertIn("equity", summary)
         self.assertIn("positions", summary)
 
+    def test_trades_are_written_and_snapshots_buffered_until_read(self):
+        portfolio = self.db.ensure_portfolio("Buffered", "manual", 1000.0)
+        self.db.record_trade(portfolio["id"], "AAPL", "buy", 1.0, 100.5, "first")
+        self.db.record_trade(portfolio["id"], "AAPL", "buy", 2.0, 100.5, "second")
+        self.db.record_equity_snapshot(portfolio["id"], 1000.0, 800.0, 200.0, 0.0, 0.0, 0.0)
+        self.assertEqual(sum(len(rows) for rows in self.db._buffers.values()), 1)
+
+        trades = self.db.get_recent_trades(portfolio["id"])
+        self.assertEqual(sorted(trade["reason"] for trade in trades), ["first", "second"])
+        self.assertTrue(all(trade["created_at"] for trade in trades))
+        self.assertEqual(len(self.db.get_portfolio_equity_history(portfolio["id"])), 1)
+
+    def test_flusher_writes_buffered_rows_in_background(self):
+        portfolio = self.db.ensure_portfolio("Background", "manual", 1000.0)
+        self.db.record_equity_snapshot(portfolio["id"], 1000.0, 1000.0, 0.0, 0.0, 0.0, 0.0)
+        raw = sqlite3.connect(self.db.db_path)
+        try:
+            for _ in range(50):
+                count = raw.execute("SELECT COUNT(*) FROM portfolio_equity").fetchone()[0]
+                if count:
+                    break
+                time.sleep(0.1)
+        finally:
+            raw.close()
+        self.assertEqual(count, 1)
+
+    def test_portfolio_writes_reject_unknown_portfolio(self):
+        with self.assertRaises(ValueError):
+            self.db.record_trade(9999, "AAPL", "buy", 1.0, 100.5, "orphan")
+        with self.assertRaises(ValueError):
+            self.db.record_equity_snapshot(9999, 1000.0, 800.0, 200.0, 0.0, 0.0, 0.0)
+        self.assertEqual(sum(len(rows) for rows in self.db._buffers.values()), 0)
+
+    def test_rejected_buffered_row_does_not_block_others(self):
+        portfolio = self.db.ensure_portfolio("Mixed", "manual", 1000.0)
+        # Bypasses any up-front check, like a portfolio deleted before the flush
+        self.db._buffer_row('equity', (9999, 1.0, 1.0, 0.0, 0.0, 0.0, 0.0, "2024-01-01 00:00:00"))
+        self.db.record_equity_snapshot(portfolio["id"], 1000.0, 1000.0, 0.0, 0.0, 0.0, 0.0)
+
+        history = self.db.get_portfolio_equity_history(portfolio["id"])
+        self.assertEqual([row["equity"] for row in history], [1000.0])
+        self.assertEqual(sum(len(rows) for rows in self.db._buffers.values()), 0)
+        self.db.flush()
+
+    def test_commit_trade_writes_cash_position_and_trade(self):
+        portfolio = self.db.ensure_portfolio("Atomic", "manual", 1000.0)
+        self.db.commit_trade(portfolio["id"], "AAPL", "buy", 2.0, 100.0, "open", 800.0, 2.0, 100.0)
+        self.assertEqual(self.db.ensure_portfolio("Atomic", "manual", 1000.0)["cash"], 800.0)
+        self.assertEqual([(p["symbol"], p["quantity"]) for p in self.db.get_portfolio_positions(portfolio["id"])],
+                         [("AAPL", 2.0)])
+        self.assertEqual([t["reason"] for t in self.db.get_recent_trades(portfolio["id"])], ["open"])
+
+        self.db.commit_trade(portfolio["id"], "AAPL", "sell", 2.0, 110.0, "close", 1020.0, 0, 0)
+        self.assertEqual(self.db.get_portfolio_positions(portfolio["id"]), [])
+
+    def test_manual_trade_is_visible_in_snapshot(self):
+        snapshot = self.service.manual_trade("AAPL", "buy", 1.0)
+        self.assertEqual([trade["action"] for trade in snapshot["trades"]], ["buy"])
+
 
 if __name__ == '__main__':
     unittest.main(verbosity=2)
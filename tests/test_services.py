@@ -5,7 +5,11 @@ import unittest
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from pathlib import Path
+
 from database.models import Database
+from services.adaptive_service import AdaptiveLearningService
+from services.cache_service import LRUCache
 from services.evaluation_service import EvaluationService
 from services.portfolio_service import PortfolioService
 
@@ -52,6 +56,37 @@ class ServiceSmokeTests(unittest.TestCase):
         self.assertIn('portfolio', summary)
         self.assertIn('equity', summary)
 
+    def test_adaptive_service_caches_active_model(self):
+        self.db.insert_historical_data('AAPL', [
+            {'date': f'2024-01-{day:02d}', 'open': 100 + day, 'high': 101 + day, 'low': 99 + day,
+             'close': 100.5 + day, 'volume': 1000}
+            for day in range(1, 21)
+        ])
+        service = AdaptiveLearningService(self.db)
+        service.model_store = Path(self.tmp.name) / 'models_store'
+        service.train('AAPL', 'ma_5')
+
+        model, meta = service.load_active_model('AAPL', 'ma_5')
+        self.assertIsNotNone(model)
+        self.assertIs(service.load_active_model('AAPL', 'ma_5')[0], model)
+
+        service.invalidate_model_cache('AAPL', 'ma_5')
+        self.assertIsNot(service.load_active_model('AAPL', 'ma_5')[0], model)
+
+    def test_lru_cache_evicts_and_expires(self):
+        cache = LRUCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIsNone(cache.get('b'))
+        self.assertEqual(cache.get('a'), 1)
+
+        expiring = LRUCache(maxsize=2, ttl=0)
+        expiring.set('a', 1)
+        self.assertIsNone(expiring.get('a'))
+        self.assertEqual(len(expiring), 0)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -4,8 +4,9 @@ Data loading utilities for importing CSV data into the database.
 
 import sys
 import os
+import numpy as np
 import pandas as pd
-from typing import Any
+from typing import Any, Dict, List
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -21,6 +22,36 @@ except Exception:
     MongoDatabase = None
 
 
+PRICE_COLUMNS = ('open', 'high', 'low', 'close')
+FEATURE_COLUMNS = ('return_1d', 'vol_5d', 'sma_5', 'sma_20')
+
+
+def _records(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Turn a frame into row dicts of Python scalars, with NaN as None."""
+    frame = frame.astype(object).where(frame.notna(), None)
+    return frame.to_dict('records')
+
+
+def _price_records(df: pd.DataFrame) -> List[Dict[str, Any]]:
+    """Price rows for insert_historical_data, converted column-wise."""
+    frame = pd.DataFrame({'date': df['date'].astype(str)})
+    for col in PRICE_COLUMNS:
+        frame[col] = df[col].astype(float)
+    frame['volume'] = df['volume'].fillna(0).astype('int64') if 'volume' in df else 0
+    for col in FEATURE_COLUMNS:
+        # Missing features are computed on insert
+        frame[col] = df[col].astype(float) if col in df else np.nan
+    return _records(frame)
+
+
+def _sentiment_records(df: pd.DataFrame, sentiment_cols: List[str]) -> List[Dict[str, Any]]:
+    """Sentiment rows for insert_sentiment_data; missing values become 0."""
+    frame = df[sentiment_cols].astype(float).fillna(0.0)
+    frame['sent_count'] = frame['sent_count'].astype('int64')
+    frame.insert(0, 'date', df['date'].astype(str))
+    return _records(frame)
+
+
 def load_csv_data(csv_path: str, symbol: str, db: Any):
     """
     Load price data from CSV file into database.
@@ -33,22 +64,7 @@ def load_csv_data(csv_path: str, symbol: str, db: Any):
     try:
         df = pd.read_csv(csv_path)
         
-        # Convert to dictionary records
-        records = []
-        for _, row in df.iterrows():
-            record = {
-                'date': str(row['date']),
-                'open': float(row['open']),
-                'high': float(row['high']),
-                'low': float(row['low']),
-                'close': float(row['close']),
-                'volume': int(row['volume']) if pd.notna(row.get('volume')) else 0,
-                'return_1d': float(row['return_1d']) if pd.notna(row.get('return_1d')) else None,
-                'vol_5d': float(row['vol_5d']) if pd.notna(row.get('vol_5d')) else None,
-                'sma_5': float(row['sma_5']) if pd.notna(row.get('sma_5')) else None,
-                'sma_20': float(row['sma_20']) if pd.notna(row.get('sma_20')) else None
-            }
-            records.append(record)
+        records = _price_records(df)
         
         # Insert into database
         db.insert_historical_data(symbol, records)
@@ -78,19 +94,7 @@ def load_sentiment_data(csv_path: str, symbol: str, db: Any):
             print(f"[SKIP] Sentiment columns not found in {csv_path}")
             return
         
-        # Convert to dictionary records
-        records = []
-        for _, row in df.iterrows():
-            record = {
-                'date': str(row['date']),
-                'sent_count': int(row['sent_count']) if pd.notna(row.get('sent_count')) else 0,
-                'sent_mean': float(row['sent_mean']) if pd.notna(row.get('sent_mean')) else 0.0,
-                'sent_median': float(row['sent_median']) if pd.notna(row.get('sent_median')) else 0.0,
-                'sent_std': float(row['sent_std']) if pd.notna(row.get('sent_std')) else 0.0,
-                'sent_pos_share': float(row['sent_pos_share']) if pd.notna(row.get('sent_pos_share')) else 0.0,
-                'sent_neg_share': float(row['sent_neg_share']) if pd.notna(row.get('sent_neg_share')) else 0.0
-            }
-            records.append(record)
+        records = _sentiment_records(df, sentiment_cols)
         
         # Insert into database
         db.insert_sentiment_data(symbol, records)